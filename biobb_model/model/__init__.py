@@ -12,6 +12,7 @@ with warnings.catch_warnings():
     from . import fix_altlocs
     from . import fix_ssbonds
     from . import fix_pdb
+    from . import fix_pipeline
 
 name = "model"
-__all__ = ["fix_side_chain", "fix_backbone", "mutate", "checking_log", "fix_amides", "fix_chirality", "fix_altlocs", "fix_ssbonds", "fix_pdb"]
+__all__ = ["fix_side_chain", "fix_backbone", "mutate", "checking_log", "fix_amides", "fix_chirality", "fix_altlocs", "fix_ssbonds", "fix_pdb", "fix_pipeline"]
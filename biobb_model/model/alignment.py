@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+"""Module containing the sequence aligner shared by the reference mapping and the local reference search."""
+
+import functools
+import re
+
+from Bio.Align import PairwiseAligner, substitution_matrices  # type: ignore
+
+# Description of the aligner scoring and the mapping from alignments, used to key memoized alignments
+# Update it every time the aligner or the mapping is changed
+ALIGNMENT_SCORING = "local BLOSUM62 open=-10 extend=-0.5 mapping=2"
+
+
+# Get a local aligner with the scoring used to map sequences
+# The aligner is created only once, since it is not modified further
+@functools.lru_cache(maxsize=None)
+def get_aligner() -> PairwiseAligner:
+    aligner = PairwiseAligner()
+    aligner.mode = "local"
+    aligner.substitution_matrix = substitution_matrices.load("BLOSUM62")
+    aligner.open_gap_score = -10
+    aligner.extend_gap_score = -0.5
+    return aligner
+
+
+# Get a pattern matching the letters which are not in the aligner substitution matrix
+@functools.lru_cache(maxsize=None)
+def _get_unknown_letters_pattern() -> re.Pattern:
+    return re.compile("[^" + re.escape("".join(get_aligner().substitution_matrix.alphabet)) + "]")
+
+
+# Replace the letters which are not in the aligner substitution matrix with 'X'
+# e.g. selenocysteine 'U' or pyrrolysine 'O' in some UniProt references, which would make the aligner fail
+def get_alignable_sequence(sequence: str) -> str:
+    return _get_unknown_letters_pattern().sub("X", sequence)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+"""Module containing the persistent memo of sequence alignment results."""
+
+import hashlib
+import json
+import os
+from typing import Optional
+
+from biobb_model.model.sqlite_store import SqliteStore
+
+# Environment variable to set the memo path when it is not explicitly passed
+ALIGNMENT_MEMO_ENV = "BIOBB_ALIGNMENT_MEMO"
+# Once the memo exceeds this number of alignments the least recently used alignments are removed
+DEFAULT_MAX_ENTRIES = 100000
+
+
+class AlignmentMemo:
+    """
+    Persistent memo of alignment results, keyed by the hashes of both aligned sequences and the scoring parameters.
+    Results are stored in a SQLite database, so the same memo can be shared by concurrent processes.
+    The least recently used results are evicted when the memo is full.
+    The number of hits and misses is counted along the memo life.
+
+    Args:
+        memo_path (str): Path to the memo database file. It is created if it does not exist.
+        scoring (str): Description of the alignment scoring parameters, which is part of every key.
+        max_entries (int): (100000) Maximum number of alignment results in the memo.
+    """
+
+    def __init__(self, memo_path: str, scoring: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.memo_path = memo_path
+        self.scoring = scoring
+        self.max_entries = max_entries
+        # Hits and misses in this memo instance only
+        self.hits = 0
+        self.misses = 0
+        self.store = SqliteStore(memo_path, "alignments", max_entries=max_entries)
+
+    # Get the key of an alignment from the hashes of both sequences and the scoring parameters
+    def get_key(self, ref_sequence: str, new_sequence: str) -> str:
+        key = hashlib.sha256(self.scoring.encode())
+        key.update(hashlib.sha256(ref_sequence.encode()).digest())
+        key.update(hashlib.sha256(new_sequence.encode()).digest())
+        return key.hexdigest()
+
+    # Get the memoized results of several alignments, in the same order
+    # Return a tuple with the results and a list of flags telling which alignments were found
+    # Note that not valid alignments are memoized as well, with None results
+    def get_results(self, ref_sequences: list[str], new_sequences: list[str]) -> tuple[list, list[bool]]:
+        keys = [self.get_key(ref_sequence, new_sequence) for ref_sequence, new_sequence in zip(ref_sequences, new_sequences)]
+        found_results = {key: json.loads(value) for key, value in self.store.get_values(keys).items()}
+        found = [key in found_results for key in keys]
+        hits = found.count(True)
+        misses = found.count(False)
+        self.store.add_counts({"hits": hits, "misses": misses})
+        self.hits += hits
+        self.misses += misses
+        results = [
+            (tuple(found_results[key]) if found_results[key] else None) if key in found_results else None
+            for key in keys
+        ]
+        return results, found
+
+    # Save the results of several alignments in the memo
+    # Then remove the least recently used results if the memo is full
+    def set_results(self, ref_sequences: list[str], new_sequences: list[str], results: list):
+        self.store.set_values({
+            self.get_key(ref_sequence, new_sequence): json.dumps(result)
+            for ref_sequence, new_sequence, result in zip(ref_sequences, new_sequences, results)
+        })
+
+    # Get the number of alignments in the memo and the hits and misses along the memo life
+    def get_stats(self) -> dict:
+        stats = {"hits": 0, "misses": 0, **self.store.get_counts()}
+        stats["entries"] = self.store.count_entries()
+        return stats
+
+
+# Get the memo in the passed path or in the path set by the environment, if any
+def get_alignment_memo(scoring: str, memo_path: Optional[str] = None) -> Optional[AlignmentMemo]:
+    memo_path = memo_path or os.environ.get(ALIGNMENT_MEMO_ENV)
+    if not memo_path:
+        return None
+    return AlignmentMemo(memo_path, scoring)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+"""Module containing the batch mode of the building blocks command line interfaces."""
+
+import argparse
+import glob
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from biobb_common.configuration import settings
+from biobb_common.tools import file_utils as fu
+
+# Command line flags which switch a building block command line to batch mode
+BATCH_INPUT_FLAGS = ["--input_dir", "--input_glob", "--input_manifest"]
+
+
+# Get the input and output arguments of a building block from its docstring
+# The first input argument is the one which is batched, the rest of inputs are shared by all batch items
+def get_batch_arguments(block_class: type) -> tuple[str, dict, dict]:
+    doc_arguments_dict, _ = fu.get_doc_dicts(block_class.__doc__)
+    input_arguments = {
+        argument: argument_dict for argument, argument_dict in doc_arguments_dict.items()
+        if argument_dict.get("input_output", "").lower().startswith("input")
+    }
+    output_arguments = {
+        argument: argument_dict for argument, argument_dict in doc_arguments_dict.items()
+        if argument_dict.get("input_output", "").lower().startswith("output")
+    }
+    batch_argument = next(iter(input_arguments))
+    shared_arguments = {argument: input_arguments[argument] for argument in list(input_arguments)[1:]}
+    return batch_argument, shared_arguments, output_arguments
+
+
+# Get the input paths of a batch from a directory, a glob pattern or a manifest file
+# Directories are filtered by the accepted input formats
+# Manifests list one input path per line, relative to the manifest directory; empty lines and '#' comments are skipped
+def get_batch_input_paths(
+    input_dir: Optional[str] = None,
+    input_glob: Optional[str] = None,
+    input_manifest: Optional[str] = None,
+    formats: Optional[list[str]] = None,
+) -> list[str]:
+    if input_dir:
+        if not os.path.isdir(input_dir):
+            raise SystemExit('Directory "' + input_dir + '" not found')
+        extensions = {"." + extension.lower() for extension in formats or []}
+        return sorted(
+            str(path) for path in Path(input_dir).iterdir()
+            if path.is_file() and (not extensions or path.suffix.lower() in extensions)
+        )
+    if input_glob:
+        return sorted(path for path in glob.glob(input_glob, recursive=True) if os.path.isfile(path))
+    if input_manifest:
+        if not os.path.exists(input_manifest):
+            raise SystemExit('File "' + input_manifest + '" not found')
+        manifest_directory = os.path.dirname(os.path.abspath(input_manifest))
+        input_paths = []
+        with open(input_manifest, "r") as file:
+            for line in file:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                input_paths.append(os.path.join(manifest_directory, line))
+        return input_paths
+    return []
+
+
+# Get the output paths of every batch item in the output directory
+# Outputs are named after the input, keeping the input extension when it is an accepted output format
+# Inputs with the same name get a numeric suffix, so no output is overwritten
+def get_batch_output_paths(input_paths: list[str], output_dir: str, output_arguments: dict) -> list[dict]:
+    used_names: set[str] = set()
+    output_paths = []
+    for input_path in input_paths:
+        stem = Path(input_path).stem
+        name = stem
+        count = 1
+        while name in used_names:
+            name = stem + "_" + str(count)
+            count += 1
+        used_names.add(name)
+        input_extension = Path(input_path).suffix[1:].lower()
+        item_output_paths = {}
+        for argument, argument_dict in output_arguments.items():
+            formats = list(argument_dict.get("formats", {}))
+            extension = input_extension if input_extension in formats or not formats else formats[0]
+            item_output_paths[argument] = os.path.join(output_dir, name + "." + extension)
+        output_paths.append(item_output_paths)
+    return output_paths
+
+
+# Run a building block on a single batch item
+# Any error is caught and returned, so a failing item does not stop the rest of the batch
+def _run_batch_item(launcher: Callable, paths: dict, properties: dict) -> tuple[int, Optional[str]]:
+    try:
+        return_code = launcher(**paths, properties=properties)
+    except (Exception, SystemExit) as error:
+        return 1, "".join(traceback.format_exception_only(type(error), error)).strip()
+    if return_code:
+        return return_code, "Exit code " + str(return_code)
+    return 0, None
+
+
+def run_batch(
+    block_class: type,
+    launcher: Callable,
+    input_paths: list[str],
+    output_dir: str,
+    shared_paths: Optional[dict] = None,
+    properties: Optional[dict] = None,
+    num_workers: int = 1,
+) -> list[dict]:
+    """
+    Runs a building block on every input path, writing the outputs in the output directory.
+    Items run in a pool of processes when **num_workers** is greater than 1. A failing item does not stop the rest.
+
+    Parameters:
+        block_class (type): The building block class, whose docstring defines the input and output arguments.
+        launcher (Callable): The building block function, e.g. :func:`fix_pdb <model.fix_pdb.fix_pdb>`.
+        input_paths (list): Paths of the inputs, which are passed as the first input argument of the block.
+        output_dir (str): Directory where the outputs are written. It is created if it does not exist.
+        shared_paths (dict): Other input arguments of the block, shared by all items.
+        properties (dict): Properties of the block, shared by all items.
+        num_workers (int): Number of processes to run the items in parallel.
+
+    Returns:
+        list: The result of every item, in the same order as the inputs, as a dict with the item paths, the return code and the error.
+    """
+    batch_argument, _, output_arguments = get_batch_arguments(block_class)
+    os.makedirs(output_dir, exist_ok=True)
+    output_paths = get_batch_output_paths(input_paths, output_dir, output_arguments)
+    items = []
+    for input_path, item_output_paths in zip(input_paths, output_paths):
+        paths = {batch_argument: input_path, **(shared_paths or {}), **item_output_paths}
+        # Every item has its own log files, named after its output, and logs are not written to the console
+        item_properties = {
+            **(properties or {}),
+            "prefix": Path(next(iter(item_output_paths.values()))).stem,
+            "can_write_console_log": False,
+        }
+        items.append((paths, item_properties))
+
+    results = []
+    if num_workers > 1 and len(items) > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(_run_batch_item, launcher, paths, item_properties) for paths, item_properties in items]
+            for (paths, _), future in zip(items, futures):
+                try:
+                    return_code, error = future.result()
+                except Exception as pool_error:
+                    return_code, error = 1, repr(pool_error)
+                results.append({"paths": paths, "return_code": return_code, "error": error})
+    else:
+        for paths, item_properties in items:
+            return_code, error = _run_batch_item(launcher, paths, item_properties)
+            results.append({"paths": paths, "return_code": return_code, "error": error})
+    return results
+
+
+# Print the summary of a batch
+def print_batch_summary(results: list[dict], batch_argument: str):
+    failed_results = [result for result in results if result["return_code"]]
+    print("Batch summary: " + str(len(results)) + " items, " + str(len(results) - len(failed_results)) + " succeeded, " + str(len(failed_results)) + " failed")
+    for result in failed_results:
+        print("   " + result["paths"][batch_argument] + " -> " + str(result["error"]))
+
+
+def get_batch_main(block_class: type, launcher: Callable, description: str) -> Callable:
+    """
+    Gets the command line execution of a building block with batch mode.
+    The command line is the one of :meth:`BiobbObject.get_main` unless one of the batch input flags is used.
+    In batch mode the first input argument of the block is replaced by the --input_dir, --input_glob or --input_manifest flags,
+    the output arguments are replaced by the --output_dir flag and the --num_workers flag sets the number of processes.
+
+    Parameters:
+        block_class (type): The building block class.
+        launcher (Callable): The building block function.
+        description (str): Description of the command line.
+
+    Returns:
+        Callable: The command line main function.
+    """
+    main = block_class.get_main(launcher, description)  # type: ignore
+
+    def batch_main():
+        if not any(arg.split("=")[0] in BATCH_INPUT_FLAGS for arg in sys.argv[1:]):
+            return main()
+        batch_argument, shared_arguments, _ = get_batch_arguments(block_class)
+        doc_arguments_dict, _ = fu.get_doc_dicts(block_class.__doc__)
+        formats = list(doc_arguments_dict[batch_argument].get("formats", {}))
+        parser = argparse.ArgumentParser(
+            description=description + " Batch mode.",
+            formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999),
+        )
+        parser.add_argument("-c", "--config", required=False, help="This file can be a YAML file, JSON file or JSON string")
+        inputs_args = parser.add_mutually_exclusive_group(required=True)
+        inputs_args.add_argument("--input_dir", help="Directory with the inputs. Accepted formats: " + ", ".join(formats) + ".")
+        inputs_args.add_argument("--input_glob", help="Glob pattern of the inputs.")
+        inputs_args.add_argument("--input_manifest", help="Text file with one input path per line.")
+        parser.add_argument("--output_dir", required=True, help="Directory where the outputs are written.")
+        parser.add_argument("--num_workers", type=int, default=os.cpu_count() or 1, help="Number of processes to run the inputs in parallel.")
+        for argument, argument_dict in shared_arguments.items():
+            parser.add_argument(
+                "--" + argument, required=not argument_dict["optional"],
+                help=argument_dict.get("description", "") + ". Shared by all inputs."
+            )
+        args = parser.parse_args()
+        properties = settings.ConfReader(config=args.config or "{}").get_prop_dic()
+        shared_paths = {argument: getattr(args, argument) for argument in shared_arguments if getattr(args, argument) is not None}
+        input_paths = get_batch_input_paths(args.input_dir, args.input_glob, args.input_manifest, formats)
+        if not input_paths:
+            parser.error("No inputs found")
+        results = run_batch(
+            block_class, launcher, input_paths, args.output_dir,
+            shared_paths=shared_paths, properties=properties, num_workers=args.num_workers,
+        )
+        print_batch_summary(results, batch_argument)
+        if any(result["return_code"] for result in results):
+            sys.exit(1)
+
+    return batch_main
@@ -1,6 +1,11 @@
 """Common functions for package biobb_model.model"""
 
+import contextlib
+import io
 import logging
+import os
+import sys
+import traceback
 from typing import Optional, Union
 
 from biobb_common.tools import file_utils as fu
@@ -58,3 +63,92 @@ def _from_string_to_list(input_data: Optional[Union[str, list[str]]]) -> list[st
     processed_items = [item.strip() for item in items if item.strip()]
 
     return processed_items
+
+
+def run_check_structure(
+    cmd: list[str],
+    out_log: Optional[logging.Logger] = None,
+    global_log: Optional[logging.Logger] = None,
+) -> int:
+    """
+    Runs a check_structure command line in the current process, calling the biobb_structure_checking library directly.
+    The binary in the first element of the command line is ignored. The '<' and '>' shell redirections are
+    applied to the standard input and output; otherwise the standard output is written to the log.
+
+    Parameters:
+        cmd (list): The check_structure command line, as built for :meth:`BiobbObject.run_biobb`.
+        out_log (logging.Logger): The block log.
+        global_log (logging.Logger): The global log.
+
+    Returns:
+        int: The return code, as the check_structure command line would return it.
+    """
+    import biobb_structure_checking  # type: ignore
+    import biobb_structure_checking.constants as cts  # type: ignore
+    from biobb_structure_checking.check_structure import header  # type: ignore
+    from biobb_structure_checking.structure_checking import StructureChecking  # type: ignore
+
+    args = list(cmd[1:])
+    stdin_path = stdout_path = None
+    if "<" in args:
+        index = args.index("<")
+        stdin_path = args[index + 1]
+        del args[index:index + 2]
+    if ">" in args:
+        index = args.index(">")
+        stdout_path = args[index + 1]
+        del args[index:index + 2]
+
+    fu.log("Running check_structure in process: " + " ".join(args), out_log, global_log)
+    return_code = 0
+    stdin = sys.stdin
+    with contextlib.ExitStack() as stack:
+        stdout = stack.enter_context(open(stdout_path, "w") if stdout_path else io.StringIO())
+        if stdin_path:
+            sys.stdin = stack.enter_context(open(stdin_path, "r"))
+        try:
+            with contextlib.redirect_stdout(stdout):
+                # The command line parser and the library exit on errors
+                print(header())
+                structure_checking = StructureChecking(
+                    biobb_structure_checking.__path__[0], vars(cts.CMD_LINE.parse_args(args))
+                )
+                structure_checking.launch()
+        except SystemExit as exit:
+            if isinstance(exit.code, int):
+                return_code = exit.code
+            elif exit.code is not None:
+                fu.log(str(exit.code), out_log, global_log)
+                return_code = 1
+        except Exception:
+            fu.log(traceback.format_exc(), out_log, global_log)
+            return_code = 1
+        finally:
+            sys.stdin = stdin
+        if not stdout_path:
+            fu.log(stdout.getvalue(), out_log)
+    fu.log("Exit code " + str(return_code), out_log, global_log)
+    return return_code
+
+
+def run_check_structure_block(block, in_process: bool = False) -> None:
+    """
+    Runs the check_structure command line of a block, in the current process if **in_process** is set, or as a new
+    process with :meth:`BiobbObject.run_biobb` otherwise. Blocks running in a container or setting environment variables,
+    a timeout or development options always run as a new process, since these only apply to new processes.
+    As in :meth:`BiobbObject.run_biobb`, the command runs in the sandbox directory if **chdir_sandbox** is set.
+
+    Parameters:
+        block (BiobbObject): The block, with the command line in its `cmd` attribute.
+        in_process (bool): Whether to run check_structure in the current process.
+    """
+    if not in_process or block.container_path or block.env_vars_dict or block.timeout or block.dev:
+        block.run_biobb()
+        return
+    cwd = os.getcwd()
+    if block.chdir_sandbox:
+        os.chdir(block.stage_io_dict["unique_dir"])
+    try:
+        block.return_code = run_check_structure(block.cmd, block.out_log, block.global_log)
+    finally:
+        os.chdir(cwd)
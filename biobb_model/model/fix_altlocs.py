@@ -7,7 +7,9 @@ from typing import Optional
 from biobb_common.generic.biobb_object import BiobbObject
 from biobb_common.tools.file_utils import launchlogger
 
-from biobb_model.model.common import _from_string_to_list
+from biobb_model.model.batch import get_batch_main
+from biobb_model.model.common import _from_string_to_list, run_check_structure_block
+from biobb_model.model.result_cache import get_result_key, restore_result, save_result
 
 
 class FixAltLocs(BiobbObject):
@@ -23,6 +25,8 @@ class FixAltLocs(BiobbObject):
             * **altlocs** (*list*) - (None) List of alternate locations to fix. Format: ["A339:A", "A171:B", "A768:A"]; where for each residue the format is as follows: "<chain><residue id>:<chosen alternate location>". If empty, no action will be executed.
             * **modeller_key** (*str*) - (None) Modeller license key.
             * **binary_path** (*str*) - ("check_structure") Path to the check_structure executable binary.
+            * **in_process** (*bool*) - (False) Run check_structure in the current process through the biobb_structure_checking library instead of launching the binary. Ignored when running in a container or when env_vars_dict, timeout or dev are set.
+            * **result_cache_path** (*str*) - (None) Path to the result cache directory. If the inputs, the relevant properties and the tool versions match a cached result, it is copied to the outputs without running the block. If not set, the BIOBB_RESULT_CACHE environment variable is used, if any.
             * **remove_tmp** (*bool*) - (True) [WF property] Remove temporal files.
             * **restart** (*bool*) - (False) [WF property] Do not execute if output files exist.
             * **sandbox_path** (*str*) - ("./") [WF property] Parent path to the sandbox directory.
@@ -66,8 +70,10 @@ class FixAltLocs(BiobbObject):
 
         # Properties specific for BB
         self.binary_path = properties.get("binary_path", "check_structure")
+        self.in_process = properties.get("in_process", False)
         self.altlocs = _from_string_to_list(properties.get("altlocs", None))
         self.modeller_key = properties.get("modeller_key")
+        self.result_cache_path = properties.get("result_cache_path")
 
         # Check the properties
         self.check_properties(properties)
@@ -80,6 +86,10 @@ class FixAltLocs(BiobbObject):
         # Setup Biobb
         if self.check_restart():
             return 0
+        # Restore the result from the cache, if any
+        result_key = get_result_key(self, ["altlocs"])
+        if restore_result(self, result_key):
+            return 0
         self.stage_files()
 
         self.cmd = [
@@ -104,11 +114,14 @@ class FixAltLocs(BiobbObject):
             self.cmd.insert(1, "--modeller_key")
 
         # Run Biobb block
-        self.run_biobb()
+        run_check_structure_block(self, self.in_process)
 
         # Copy files to host
         self.copy_to_host()
 
+        # Save the result in the cache
+        save_result(self, result_key)
+
         # Remove temporal files
         self.remove_tmp_files()
 
@@ -128,7 +141,7 @@ def fix_altlocs(
 
 
 fix_altlocs.__doc__ = FixAltLocs.__doc__
-main = FixAltLocs.get_main(fix_altlocs, "Fix alternate locations from residues")
+main = get_batch_main(FixAltLocs, fix_altlocs, "Fix alternate locations from residues")
 
 if __name__ == "__main__":
     main()
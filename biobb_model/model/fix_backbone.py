@@ -8,6 +8,10 @@ from biobb_common.generic.biobb_object import BiobbObject
 from biobb_common.tools import file_utils as fu
 from biobb_common.tools.file_utils import launchlogger
 
+from biobb_model.model.batch import get_batch_main
+from biobb_model.model.common import run_check_structure_block
+from biobb_model.model.result_cache import get_result_key, restore_result, save_result
+
 
 class FixBackbone(BiobbObject):
     """
@@ -23,6 +27,8 @@ class FixBackbone(BiobbObject):
             * **add_caps** (*bool*) - (False) Add caps to terminal residues.
             * **modeller_key** (*str*) - (None) Modeller license key.
             * **binary_path** (*str*) - ("check_structure") Path to the check_structure executable binary.
+            * **in_process** (*bool*) - (False) Run check_structure in the current process through the biobb_structure_checking library instead of launching the binary. Ignored when running in a container or when env_vars_dict, timeout or dev are set.
+            * **result_cache_path** (*str*) - (None) Path to the result cache directory. If the inputs, the relevant properties and the tool versions match a cached result, it is copied to the outputs without running the block. If not set, the BIOBB_RESULT_CACHE environment variable is used, if any.
             * **remove_tmp** (*bool*) - (True) [WF property] Remove temporal files.
             * **restart** (*bool*) - (False) [WF property] Do not execute if output files exist.
             * **sandbox_path** (*str*) - ("./") [WF property] Parent path to the sandbox directory.
@@ -71,8 +77,10 @@ class FixBackbone(BiobbObject):
 
         # Properties specific for BB
         self.binary_path = properties.get("binary_path", "check_structure")
+        self.in_process = properties.get("in_process", False)
         self.add_caps = properties.get("add_caps", False)
         self.modeller_key = properties.get("modeller_key")
+        self.result_cache_path = properties.get("result_cache_path")
 
         # Check the properties
         self.check_properties(properties)
@@ -82,11 +90,15 @@ class FixBackbone(BiobbObject):
     def launch(self) -> int:
         """Execute the :class:`FixBackbone <model.fix_backbone.FixBackbone>` object."""
 
-        self.io_dict["in"]["stdin_file_path"] = fu.create_stdin_file(f'{self.io_dict["in"]["input_fasta_canonical_sequence_path"]}')
-
         # Setup Biobb
         if self.check_restart():
             return 0
+        # Restore the result from the cache, if any
+        result_key = get_result_key(self, ["add_caps"])
+        if restore_result(self, result_key):
+            return 0
+
+        self.io_dict["in"]["stdin_file_path"] = fu.create_stdin_file(f'{self.io_dict["in"]["input_fasta_canonical_sequence_path"]}')
         self.stage_files()
 
         # Create command line
@@ -123,11 +135,14 @@ class FixBackbone(BiobbObject):
         #     return 1
 
         # Run Biobb block
-        self.run_biobb()
+        run_check_structure_block(self, self.in_process)
 
         # Copy files to host
         self.copy_to_host()
 
+        # Save the result in the cache
+        save_result(self, result_key)
+
         # Remove temporal files
         self.tmp_files.append(self.io_dict["in"].get("stdin_file_path", ""))
         self.remove_tmp_files()
@@ -149,7 +164,7 @@ def fix_backbone(
 
 
 fix_backbone.__doc__ = FixBackbone.__doc__
-main = FixBackbone.get_main(fix_backbone, "Model the missing atoms in the backbone of a PDB structure.")
+main = get_batch_main(FixBackbone, fix_backbone, "Model the missing atoms in the backbone of a PDB structure.")
 
 if __name__ == "__main__":
     main()
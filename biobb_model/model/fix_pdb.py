@@ -7,7 +7,13 @@ from typing import Optional
 from biobb_common.generic.biobb_object import BiobbObject
 from biobb_common.tools.file_utils import launchlogger
 
+from biobb_model.model.alignment import ALIGNMENT_SCORING
+from biobb_model.model.alignment_memo import get_alignment_memo
+from biobb_model.model.batch import get_batch_main
 from biobb_model.model.fix_pdb_utils import Structure, generate_map_online
+from biobb_model.model.result_cache import get_result_key, restore_result, save_result
+from biobb_model.model.uniprot_cache import get_uniprot_cache
+from biobb_model.model.uniprot_fasta import UniprotFastaIndex
 
 
 class FixPdb(BiobbObject):
@@ -17,10 +23,15 @@ class FixPdb(BiobbObject):
     | Fix the residue numbering in a PDB structure according to a reference sequence from UniProt.
 
     Args:
-        input_pdb_path (str): Input PDB file path. File type: input. `Sample file <https://github.com/bioexcel/biobb_model/raw/master/biobb_model/test/data/model/2ki5.pdb>`_. Accepted formats: pdb (edam:format_1476).
-        output_pdb_path (str): Output PDB file path. File type: output. `Sample file <https://github.com/bioexcel/biobb_model/raw/master/biobb_model/test/reference/model/output_pdb_path.pdb>`_. Accepted formats: pdb (edam:format_1476).
+        input_pdb_path (str): Input PDB file path. File type: input. `Sample file <https://github.com/bioexcel/biobb_model/raw/master/biobb_model/test/data/model/2ki5.pdb>`_. Accepted formats: pdb (edam:format_1476), cif (edam:format_1477).
+        output_pdb_path (str): Output PDB file path. File type: output. `Sample file <https://github.com/bioexcel/biobb_model/raw/master/biobb_model/test/reference/model/output_pdb_path.pdb>`_. Accepted formats: pdb (edam:format_1476), cif (edam:format_1477).
         properties (dict - Python dictionary object containing the tool parameters, not input/output files):
             * **forced_uniprot_references** (*str*) - (None) Set the UniProt accessions for sequences to be used as reference.
+            * **uniprot_cache_path** (*str*) - (None) Path to a persistent cache of UniProt references, shared between runs. If not set, the BIOBB_UNIPROT_CACHE environment variable is used. If neither is set, references are not cached. Write-ahead logging is only used if the BIOBB_SQLITE_WAL environment variable is set to 1, since it is unsafe on network file systems (e.g. NFS or Lustre).
+            * **uniprot_fasta_path** (*str*) - (None) Path to a local UniProt FASTA file (e.g. Swiss-Prot) to resolve references offline. An index is built next to it the first time. Chains with no forced reference are then searched in this FASTA file instead of running the online BLAST.
+            * **alignment_memo_path** (*str*) - (None) Path to a persistent memo of alignment results, shared between runs, so known chain and reference pairs are not aligned again. If not set, the BIOBB_ALIGNMENT_MEMO environment variable is used. If neither is set, alignments are not memoized. Write-ahead logging is enabled as in uniprot_cache_path.
+            * **num_workers** (*int*) - (1) Number of processes to align chain sequences with reference sequences in parallel. Results do not depend on it.
+            * **result_cache_path** (*str*) - (None) Path to the result cache directory. If the inputs, the relevant properties and the tool versions match a cached result, it is copied to the outputs without running the block. If not set, the BIOBB_RESULT_CACHE environment variable is used, if any. The contents of the uniprot_fasta_path file are part of the key, but the uniprot_cache_path and alignment_memo_path caches are deliberately left out, so a result may reflect stale references or alignments stored there.
             * **remove_tmp** (*bool*) - (True) [WF property] Remove temporal files.
             * **restart** (*bool*) - (False) [WF property] Do not execute if output files exist.
             * **sandbox_path** (*str*) - ("./") [WF property] Parent path to the sandbox directory.
@@ -62,6 +73,11 @@ class FixPdb(BiobbObject):
         # If input forced uniprot references is a string and not a list then convert it
         if isinstance(self.forced_uniprot_references, str):
             self.forced_uniprot_references = self.forced_uniprot_references.split(" ")
+        self.uniprot_cache_path = properties.get("uniprot_cache_path")
+        self.uniprot_fasta_path = properties.get("uniprot_fasta_path")
+        self.num_workers = properties.get("num_workers", 1)
+        self.alignment_memo_path = properties.get("alignment_memo_path")
+        self.result_cache_path = properties.get("result_cache_path")
 
         # Check the properties
         self.check_properties(properties)
@@ -74,6 +90,14 @@ class FixPdb(BiobbObject):
         # Setup Biobb
         if self.check_restart():
             return 0
+        # Restore the result from the cache, if any
+        # The local FASTA file is hashed by contents, so replacing it at the same path invalidates the results
+        # The UniProt cache and the alignment memo are deliberately not part of the key, see the result_cache_path property
+        result_key = get_result_key(
+            self, ["forced_uniprot_references"], {"uniprot_fasta_path": self.uniprot_fasta_path}
+        )
+        if restore_result(self, result_key):
+            return 0
 
         # Run code
         self.return_code = 0
@@ -83,8 +107,8 @@ class FixPdb(BiobbObject):
         output_pdb_path = self.io_dict["out"]["output_pdb_path"]
         forced_uniprot_references = self.forced_uniprot_references
 
-        # Read and parse the input pdb file
-        structure = Structure.from_pdb_file(input_pdb_path)
+        # Read and parse the input pdb or mmcif file
+        structure = Structure.from_file(input_pdb_path)
 
         # Add protein chains in case they are missing
         chains = structure.chains
@@ -96,7 +120,15 @@ class FixPdb(BiobbObject):
         # Run all the mapping function
         # mapping: Optional[dict[Any, Any]] = {}
         # if forced_uniprot_references:
-        mapping = generate_map_online(structure, forced_uniprot_references)  # type: ignore
+        uniprot_cache = get_uniprot_cache(self.uniprot_cache_path)
+        uniprot_fasta_index = UniprotFastaIndex(self.uniprot_fasta_path) if self.uniprot_fasta_path else None
+        alignment_memo = get_alignment_memo(ALIGNMENT_SCORING, self.alignment_memo_path)
+        mapping = generate_map_online(
+            structure, forced_uniprot_references, uniprot_cache, uniprot_fasta_index,  # type: ignore
+            self.num_workers, alignment_memo
+        )
+        if alignment_memo:
+            print("Alignment memo: " + str(alignment_memo.hits) + " hits, " + str(alignment_memo.misses) + " misses")
 
         # In case something went wrong with the mapping stop here
         if not mapping:
@@ -104,18 +136,20 @@ class FixPdb(BiobbObject):
             return self.return_code
 
         # Change residue numbers in the structure according to the mapping results
+        # Residues with no mapped number keep their current number
         mapped_residue_numbers = mapping["residue_reference_numbers"]
-        for r, residue in enumerate(structure.residues):
-            mapped_residue_number = mapped_residue_numbers[r]
-            if mapped_residue_number is None:
-                continue
-            residue.number = mapped_residue_number
+        if mapped_residue_numbers:
+            structure.renumber_residues(mapped_residue_numbers)
 
-        # Write the modified structure to a new pdb file
-        structure.generate_pdb_file(output_pdb_path)
+        # Write the modified structure to a new pdb or mmcif file
+        # Note that pdb files can not hold more than 99999 atoms or 9999 residues without repeating numbers
+        structure.generate_file(output_pdb_path)
 
         print("Fixed :)")
 
+        # Save the result in the cache
+        save_result(self, result_key)
+
         # Remove temporal files
         self.remove_tmp_files()
 
@@ -135,7 +169,7 @@ def fix_pdb(
 
 
 fix_pdb.__doc__ = FixPdb.__doc__
-main = FixPdb.get_main(fix_pdb, "Model the missing atoms in the backbone of a PDB structure.")
+main = get_batch_main(FixPdb, fix_pdb, "Model the missing atoms in the backbone of a PDB structure.")
 
 if __name__ == "__main__":
     main()
@@ -1,29 +1,37 @@
+import base64
+import contextlib
+import hashlib
+import http.client
+import io
+import itertools
 import json
-import math
+import operator
 import os
+import re
+import threading
+import urllib.parse
 import urllib.request
-from bisect import bisect
-from typing import Optional, Union
+from bisect import bisect, insort
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Sequence, Union
 
+import numpy as np
 import xmltodict  # type: ignore
-from Bio import pairwise2  # type: ignore
 from Bio.Blast import NCBIWWW  # type: ignore
-from Bio.pairwise2 import format_alignment  # type: ignore
 
-Coords = tuple[float, float, float]
-
-try:
-    from Bio.SubsMat import MatrixInfo  # type: ignore
-
-    blosum62 = MatrixInfo.blosum62
-except ImportError:
-    from Bio.Align import substitution_matrices  # type: ignore
+from biobb_model.model.alignment import get_alignable_sequence, get_aligner
+from biobb_model.model.alignment_memo import AlignmentMemo
+from biobb_model.model.uniprot_cache import UniprotCache
+from biobb_model.model.uniprot_fasta import UniprotFastaIndex
 
-    blosum62 = substitution_matrices.load("BLOSUM62")
+Coords = tuple[float, float, float]
 
 
 # An atom
 class Atom:
+    # Slots avoid a per-instance dictionary, which is most of the memory used by each atom
+    __slots__ = ("name", "element", "_coords", "_structure", "_index", "_residue_index")
+
     def __init__(
         self,
         name: Optional[str] = None,
@@ -32,18 +40,20 @@ class Atom:
     ):
         self.name = name
         self.element = element
-        self.coords = coords
+        # Coordinates and residue index are kept in the atom only until the atom is set in a structure
+        # Then they are moved to the structure arrays
+        self._coords = coords
+        self._residue_index: Optional[int] = None
         # Set variables to store references to other related instances
         # These variables will be set further by the structure
         self._structure: Optional[Structure] = None
         self._index: Optional[int] = None
-        self._residue_index: Optional[int] = None
 
     def __repr__(self):
         return "<Atom " + str(self.name) + ">"
 
     def __eq__(self, other):
-        return self._residue_index == other._residue_index and self.name == other.name
+        return self.residue_index == other.residue_index and self.name == other.name
 
     # The parent structure (read only)
     # This value is set by the structure itself
@@ -64,10 +74,33 @@ class Atom:
         "The residue index according to parent structure residues (read only)",
     )
 
+    # The atom coordinates
+    # Once the atom is set in a structure this is a view of its row in the structure coordinates array
+    # Thus changes in the returned array are changes in the structure as well
+    def get_coords(self) -> Optional[Union[np.ndarray, Coords]]:
+        if not self.structure:
+            return self._coords
+        coords = self.structure.coords[self.index]
+        # Missing coordinates are stored as NaN in the structure
+        if np.isnan(coords[0]):
+            return None
+        return coords
+
+    def set_coords(self, new_coords: Optional[Coords]):
+        if not self.structure:
+            self._coords = new_coords
+            return
+        self.structure.coords[self.index] = np.nan if new_coords is None else new_coords
+
+    coords = property(get_coords, set_coords, None, "The atom coordinates")
+
     # The atom residue index according to parent structure residues
     # If residue index is set then make changes in all the structure to make this change coherent
     def get_residue_index(self) -> Optional[int]:
-        return self._residue_index
+        if not self.structure:
+            return self._residue_index
+        residue_index = int(self.structure.atom_residue_indices[self.index])
+        return None if residue_index == -1 else residue_index
 
     def set_residue_index(self, new_residue_index: int):
         # If there is not strucutre yet it means the residue is beeing set before the structure
@@ -134,6 +167,8 @@ class Atom:
 
 # A residue
 class Residue:
+    __slots__ = ("name", "number", "icode", "_structure", "_index", "_atom_indices", "_chain_index")
+
     def __init__(
         self,
         name: Optional[str] = None,
@@ -143,12 +178,14 @@ class Residue:
         self.name = name
         self.number = number
         self.icode = icode
+        # Atom indices and chain index are kept in the residue only until the residue is set in a structure
+        # Then they are moved to the structure arrays
+        self._atom_indices: Sequence[int] = []
+        self._chain_index: Optional[int] = None
         # Set variables to store references to other related instaces
         # These variables will be set further by the structure
         self._structure: Optional[Structure] = None
         self._index: Optional[int] = None
-        self._atom_indices: list[int] = []
-        self._chain_index: Optional[int] = None
 
     def __repr__(self):
         return (
@@ -159,12 +196,12 @@ class Residue:
         if not isinstance(self, type(other)):
             return False
         return (
-            self._chain_index == other._chain_index and self.number == other.number and self.icode == other.icode
+            self.chain_index == other.chain_index and self.number == other.number and self.icode == other.icode
         )
 
     def __hash__(self):
         # WARNING: This is susceptible to duplicated residues
-        return hash((self._chain_index, self.number, self.icode))
+        return hash((self.chain_index, self.number, self.icode))
         # WARNING: This is not susceptible to duplicated residues
         # return hash(tuple(self._atom_indices))
 
@@ -193,25 +230,24 @@ class Residue:
     )
 
     # The atom indices according to parent structure atoms for atoms in this residue
+    # Once the residue is set in a structure this is a read only slice of the structure hierarchy arrays
     # If atom indices are set then make changes in all the structure to make this change coherent
-    def get_atom_indices(self) -> list[int]:
-        return self._atom_indices
+    def get_atom_indices(self) -> Sequence[int]:
+        if not self.structure:
+            return self._atom_indices
+        return self.structure.get_residue_atom_indices(self.index)
 
-    def set_atom_indices(self, new_atom_indices: list[int]):
+    def set_atom_indices(self, new_atom_indices: Sequence[int]):
         # If there is not strucutre yet it means the residue is beeing set before the structure
         # We just save atom indices and wait for the structure to be set
         if not self.structure:
             self._atom_indices = new_atom_indices
             return
-        # Update the current atoms
-        for atom in self.atoms:
-            atom._residue_index = None
-        # Update the new atoms
-        for index in new_atom_indices:
-            atom = self.structure.atoms[index]
-            atom._residue_index = self.index
-        # Now new indices are coherent and thus we can save them
-        self._atom_indices = new_atom_indices
+        # Release the current atoms and then claim the new atoms
+        atom_residue_indices = self.structure.atom_residue_indices
+        atom_residue_indices[atom_residue_indices == self.index] = -1
+        atom_residue_indices[np.asarray(new_atom_indices, dtype=np.int64)] = self.index
+        self.structure.hierarchy_changed(chain_residues=False)
 
     atom_indices = property(
         get_atom_indices,
@@ -229,7 +265,7 @@ class Residue:
             return []
         # Get atoms in the structure according to atom indices
         atoms = self.structure.atoms
-        return [atoms[atom_index] for atom_index in self.atom_indices]
+        return [atoms[atom_index] for atom_index in self.atom_indices.tolist()]
 
     def set_atoms(self, new_atoms: list["Atom"]):
         # Find indices for new atoms and set their indices as the new atom indices
@@ -248,24 +284,37 @@ class Residue:
 
     # Add an atom to the residue
     def add_atom(self, new_atom: "Atom"):
-        # Insert the new atom index in the list of atom indices keeping the order
-        new_atom_index = new_atom.index
-        sorted_atom_index = bisect(self.atom_indices, new_atom_index)
-        self.atom_indices.insert(sorted_atom_index, new_atom_index)
-        # Update the atom internal index
-        new_atom._residue_index = self.index
+        # If there is not strucutre yet then insert the new atom index in the list of atom indices keeping the order
+        if not self.structure:
+            atom_indices = list(self._atom_indices)
+            atom_indices.insert(bisect(atom_indices, new_atom.index), new_atom.index)
+            self._atom_indices = atom_indices
+            return
+        # Update the atom residue index in the structure
+        self.structure.atom_residue_indices[new_atom.index] = self.index
+        self.structure.hierarchy_changed(chain_residues=False)
 
     # Remove an atom from the residue
     def remove_atom(self, current_atom: "Atom"):
-        # Remove the current atom index from the atom indices list
-        self.atom_indices.remove(current_atom.index)  # This index MUST be in the list
-        # Update the atom internal index
-        current_atom._residue_index = None
+        if not self.structure:
+            atom_indices = list(self._atom_indices)
+            atom_indices.remove(current_atom.index)  # This index MUST be in the list
+            self._atom_indices = atom_indices
+            return
+        # This atom MUST be in the residue
+        if current_atom.residue_index != self.index:
+            raise ValueError("Atom " + str(current_atom) + " is not in residue " + str(self))
+        # Update the atom residue index in the structure
+        self.structure.atom_residue_indices[current_atom.index] = -1
+        self.structure.hierarchy_changed(chain_residues=False)
 
     # The residue chain index according to parent structure chains
     # If chain index is set then make changes in all the structure to make this change coherent
     def get_chain_index(self) -> Optional[int]:
-        return self._chain_index
+        if not self.structure:
+            return self._chain_index
+        chain_index = int(self.structure.residue_chain_indices[self.index])
+        return None if chain_index == -1 else chain_index
 
     def set_chain_index(self, new_chain_index: int):
         # If there is not strucutre yet it means the chain is beeing set before the structure
@@ -329,13 +378,17 @@ class Residue:
 
 # A chain
 class Chain:
+    __slots__ = ("_name", "_structure", "_index", "_residue_indices")
+
     def __init__(self, name: Optional[str] = None):
-        self.name = name
+        self._name = name
+        # Residue indices are kept in the chain only until the chain is set in a structure
+        # Then they are moved to the structure arrays
+        self._residue_indices: Sequence[int] = []
         # Set variables to store references to other related instaces
         # These variables will be set further by the structure
         self._structure: Optional[Structure] = None
         self._index: Optional[int] = None
-        self.residue_indices = []
 
     def __repr__(self):
         return "<Chain " + str(self.name) + ">"
@@ -350,6 +403,21 @@ class Chain:
 
     structure = property(get_structure, None, None, "The parent structure(read only)")
 
+    # The chain name
+    # If the name is changed then the parent structure chain name index is updated as well
+    def get_name(self) -> Optional[str]:
+        return self._name
+
+    def set_name(self, new_name: Optional[str]):
+        if not self.structure:
+            self._name = new_name
+            return
+        self.structure._unindex_chain_name(self)
+        self._name = new_name
+        self.structure._index_chain_name(self)
+
+    name = property(get_name, set_name, None, "The chain name")
+
     # The residue index according to parent structure residues(read only)
     # This value is set by the structure itself
     def get_index(self):
@@ -357,8 +425,10 @@ class Chain:
 
     # When the index is set all residues are updated with the nex chain index
     def set_index(self, index: int):
-        for residue in self.residues:
-            residue._chain_index = index
+        if self.structure:
+            residue_chain_indices = self.structure.residue_chain_indices
+            residue_chain_indices[residue_chain_indices == self._index] = index
+            self.structure.hierarchy_changed(residue_atoms=False)
         self._index = index
 
     index = property(
@@ -369,28 +439,27 @@ class Chain:
     )
 
     # The residue indices according to parent structure residues for residues in this chain
+    # Once the chain is set in a structure this is a read only slice of the structure hierarchy arrays
     # If residue indices are set then make changes in all the structure to make this change coherent
-    def get_residue_indices(self) -> list[int]:
-        return self._residue_indices
+    def get_residue_indices(self) -> Sequence[int]:
+        if not self.structure:
+            return self._residue_indices
+        return self.structure.get_chain_residue_indices(self.index)
 
-    def set_residue_indices(self, new_residue_indices: list[int]):
+    def set_residue_indices(self, new_residue_indices: Sequence[int]):
         # If there is not strucutre yet it means the chain is beeing set before the structure
         # We just save residue indices and wait for the structure to be set
         if not self.structure:
             self._residue_indices = new_residue_indices
             return
-        # Update the current residues
-        for residue in self.residues:
-            residue._chain_index = None
-        # Update the new residues
-        for index in new_residue_indices:
-            residue = self.structure.residues[index]
-            residue._chain_index = self.index
+        # Release the current residues and then claim the new residues
+        residue_chain_indices = self.structure.residue_chain_indices
+        residue_chain_indices[residue_chain_indices == self.index] = -1
+        residue_chain_indices[np.asarray(new_residue_indices, dtype=np.int64)] = self.index
+        self.structure.hierarchy_changed(residue_atoms=False)
         # In case the new residue indices list is empty this chain must be removed from its structure
         if len(new_residue_indices) == 0:
             self.structure.purge_chain(self)
-        # Now new indices are coherent and thus we can save them
-        self._residue_indices = new_residue_indices
 
     residue_indices = property(
         get_residue_indices,
@@ -408,7 +477,7 @@ class Chain:
             return []
         # Get residues in the structure according to residue indices
         residues = self.structure.residues
-        return [residues[residue_index] for residue_index in self.residue_indices]
+        return [residues[residue_index] for residue_index in self.residue_indices.tolist()]
 
     def set_residues(self, new_residues: list["Residue"]):
         # Find indices for new residues and set their indices as the new residue indices
@@ -427,26 +496,40 @@ class Chain:
 
     # Add a residue to the chain
     def add_residue(self, residue: "Residue"):
-        # Insert the new residue index in the list of residue indices keeping the order
-        sorted_residue_index = bisect(self.residue_indices, residue.index)
-        self.residue_indices.insert(sorted_residue_index, residue.index)
-        # Update the residue internal chain index
-        residue._chain_index = self.index
+        # If there is not strucutre yet then insert the new residue index in the list of residue indices keeping the order
+        if not self.structure:
+            residue_indices = list(self._residue_indices)
+            residue_indices.insert(bisect(residue_indices, residue.index), residue.index)
+            self._residue_indices = residue_indices
+            return
+        # Update the residue chain index in the structure
+        self.structure.residue_chain_indices[residue.index] = self.index
+        self.structure.hierarchy_changed(residue_atoms=False)
 
     # Remove a residue from the chain
     # WARNING: Note that this function does not trigger the set_residue_indices
     def remove_residue(self, residue: "Residue"):
-        self.residue_indices.remove(residue.index)  # This index MUST be in the list
-        # If we removed the last index then this chain must be removed from its structure
-        if len(self.residue_indices) == 0 and self.structure:
+        if not self.structure:
+            residue_indices = list(self._residue_indices)
+            residue_indices.remove(residue.index)  # This index MUST be in the list
+            self._residue_indices = residue_indices
+            return
+        # This residue MUST be in the chain
+        if residue.chain_index != self.index:
+            raise ValueError("Residue " + str(residue) + " is not in chain " + str(self))
+        # Update the residue chain index in the structure
+        self.structure.residue_chain_indices[residue.index] = -1
+        self.structure.hierarchy_changed(residue_atoms=False)
+        # If we removed the last residue then this chain must be removed from its structure
+        if not self.structure.chain_has_residues(self.index):
             self.structure.purge_chain(self)
-        # Update the residue internal chain index
-        residue._chain_index = None
 
     # Atom indices for all atoms in the chain(read only)
     # In order to change atom indices they must be changed in their corresponding residues
-    def get_atom_indices(self) -> list[int]:
-        return sum([residue.atom_indices for residue in self.residues], [])
+    def get_atom_indices(self) -> Sequence[int]:
+        if not self.structure:
+            return []
+        return self.structure.get_chain_atom_indices(self.index)
 
     atom_indices = property(
         get_atom_indices,
@@ -457,8 +540,11 @@ class Chain:
 
     # Atoms in the chain(read only)
     # In order to change atoms they must be changed in their corresponding residues
-    def get_atoms(self) -> list[int]:
-        return sum([residue.atoms for residue in self.residues], [])
+    def get_atoms(self) -> list["Atom"]:
+        if not self.structure:
+            return []
+        atoms = self.structure.atoms
+        return [atoms[atom_index] for atom_index in self.atom_indices.tolist()]
 
     atoms = property(get_atoms, None, None, "Atoms in the chain(read only)")
 
@@ -470,19 +556,53 @@ class Chain:
 
 
 # A structure is a group of atoms organized in chains and residues
+# The hierarchy is stored in arrays: the residue index of each atom and the chain index of each residue
+# Atoms of each residue and residues of each chain are found through offset arrays, as in CSR sparse matrices
+# These offset arrays are rebuilt only when they are requested after a change in the hierarchy
 class Structure:
     def __init__(
         self,
         atoms: list["Atom"] = [],
         residues: list["Residue"] = [],
         chains: list["Chain"] = [],
+        coords: Optional[np.ndarray] = None,
     ):
         self.atoms: list[Atom] = []
         self.residues: list[Residue] = []
         self.chains: list[Chain] = []
+        # All atom coordinates are stored in a single Nx3 array
+        # Rows beyond the number of atoms are spare capacity for new atoms
+        self._coords = np.empty((len(atoms), 3), dtype=np.float64)
+        # The residue index of each atom and the chain index of each residue
+        # Missing indices are stored as -1
+        # Rows beyond the number of atoms/residues are spare capacity as well
+        self._atom_residue_indices = np.empty(len(atoms), dtype=np.int64)
+        self._residue_chain_indices = np.empty(len(residues), dtype=np.int64)
+        # Offset arrays, which are set when requested
+        self._residue_atoms: Optional[tuple[np.ndarray, np.ndarray]] = None
+        self._chain_residues: Optional[tuple[np.ndarray, np.ndarray]] = None
+        self._chain_atoms: Optional[tuple[np.ndarray, np.ndarray]] = None
+        # Chains by name, sorted by chain index, and chain names in the alphabet which are not used yet
+        self._chains_by_name: dict[Optional[str], list[Chain]] = {}
+        self._free_chain_names: list[str] = list(available_caps)
         # Set references between instances
-        for atom in atoms:
-            self.set_new_atom(atom)
+        # If coordinates for all atoms are passed together then atom coordinates are ignored
+        if coords is None:
+            for atom in atoms:
+                self.set_new_atom(atom)
+        else:
+            self._coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+            if len(self._coords) != len(atoms):
+                raise ValueError(
+                    "Number of coordinates (" + str(len(self._coords)) + ") does not match the number of atoms (" + str(len(atoms)) + ")"
+                )
+            for atom_index, atom in enumerate(atoms):
+                self._atom_residue_indices[atom_index] = -1 if atom._residue_index is None else atom._residue_index
+                atom._coords = None
+                atom._residue_index = None
+                atom._structure = self
+                atom._index = atom_index
+            self.atoms = list(atoms)
         for residue in residues:
             self.set_new_residue(residue)
         for chain in chains:
@@ -491,24 +611,111 @@ class Structure:
     def __repr__(self):
         return "<Structure(" + str(len(self.atoms)) + " atoms)>"
 
+    # The coordinates of all atoms in the structure as a Nx3 array
+    # Atom coordinates are views of the rows in this array
+    def get_coords(self) -> np.ndarray:
+        return self._coords[: len(self.atoms)]
+
+    coords = property(get_coords, None, None, "The coordinates of all atoms in the structure as a Nx3 array")
+
+    # The residue index of each atom in the structure(-1 if none)
+    # WARNING: Call 'hierarchy_changed' after modifying this array directly
+    def get_atom_residue_indices(self) -> np.ndarray:
+        return self._atom_residue_indices[: len(self.atoms)]
+
+    atom_residue_indices = property(
+        get_atom_residue_indices, None, None, "The residue index of each atom in the structure (-1 if none)"
+    )
+
+    # The chain index of each residue in the structure(-1 if none)
+    # WARNING: Call 'hierarchy_changed' after modifying this array directly
+    def get_residue_chain_indices(self) -> np.ndarray:
+        return self._residue_chain_indices[: len(self.residues)]
+
+    residue_chain_indices = property(
+        get_residue_chain_indices, None, None, "The chain index of each residue in the structure (-1 if none)"
+    )
+
+    # Forget the current offset arrays so they are rebuilt next time they are requested
+    # Set which relations have changed: atoms in residues and/or residues in chains
+    def hierarchy_changed(self, residue_atoms: bool = True, chain_residues: bool = True):
+        if residue_atoms:
+            self._residue_atoms = None
+        if chain_residues:
+            self._chain_residues = None
+        self._chain_atoms = None
+
+    # Check if a chain has any residue
+    # This does not require offset arrays, so it is cheap while the hierarchy is being changed
+    def chain_has_residues(self, chain_index: int) -> bool:
+        return bool(np.any(self.residue_chain_indices == chain_index))
+
+    # Get the atom indices of a residue as a read only array
+    def get_residue_atom_indices(self, residue_index: int) -> np.ndarray:
+        if self._residue_atoms is None:
+            self._residue_atoms = _group_indices(self.atom_residue_indices, len(self.residues))
+        offsets, indices = self._residue_atoms
+        return indices[offsets[residue_index]:offsets[residue_index + 1]]
+
+    # Get the residue indices of a chain as a read only array
+    def get_chain_residue_indices(self, chain_index: int) -> np.ndarray:
+        if self._chain_residues is None:
+            self._chain_residues = _group_indices(self.residue_chain_indices, len(self.chains))
+        offsets, indices = self._chain_residues
+        return indices[offsets[chain_index]:offsets[chain_index + 1]]
+
+    # Get the atom indices of a chain as a read only array
+    # Atoms are sorted by residue index and then by atom index
+    def get_chain_atom_indices(self, chain_index: int) -> np.ndarray:
+        if self._chain_atoms is None:
+            # Sort atoms by residue index, as residues are sorted in the residue atom offsets
+            if self._residue_atoms is None:
+                self._residue_atoms = _group_indices(self.atom_residue_indices, len(self.residues))
+            _, atom_indices = self._residue_atoms
+            # Then group them by chain keeping this order
+            atom_chain_indices = self.residue_chain_indices[self.atom_residue_indices[atom_indices]]
+            offsets, order = _group_indices(atom_chain_indices, len(self.chains))
+            chain_atom_indices = atom_indices[order]
+            chain_atom_indices.flags.writeable = False
+            self._chain_atoms = offsets, chain_atom_indices
+        offsets, indices = self._chain_atoms
+        return indices[offsets[chain_index]:offsets[chain_index + 1]]
+
     # Set a new atom in the structure
     def set_new_atom(self, atom: "Atom"):
-        atom._structure = self
         new_atom_index = len(self.atoms)
+        # Grow the atom arrays if there is no capacity left
+        # Capacity is doubled so adding atoms one by one has a constant amortized cost
+        if new_atom_index >= len(self._coords):
+            self._coords = _grow(self._coords)
+            self._atom_residue_indices = _grow(self._atom_residue_indices)
+        # Move the atom coordinates and residue index to the structure arrays
+        self._coords[new_atom_index] = np.nan if atom._coords is None else atom._coords
+        self._atom_residue_indices[new_atom_index] = -1 if atom._residue_index is None else atom._residue_index
+        atom._coords = None
+        atom._residue_index = None
+        atom._structure = self
         self.atoms.append(atom)
         atom._index = new_atom_index
+        self.hierarchy_changed()
 
     # Set a new residue in the structure
     # WARNING: Atoms must be set already before setting residues
     def set_new_residue(self, residue: "Residue"):
-        residue._structure = self
         new_residue_index = len(self.residues)
+        if new_residue_index >= len(self._residue_chain_indices):
+            self._residue_chain_indices = _grow(self._residue_chain_indices)
+        # Move the residue chain index to the structure array
+        self._residue_chain_indices[new_residue_index] = -1 if residue._chain_index is None else residue._chain_index
+        residue._chain_index = None
+        residue._structure = self
         self.residues.append(residue)
         residue._index = new_residue_index
         # In case the residue has atom indices, set relational indices on each atom
-        for atom_index in residue.atom_indices:
-            atom = self.atoms[atom_index]
-            atom._residue_index = new_residue_index
+        if len(residue._atom_indices) > 0:
+            self._atom_residue_indices[np.asarray(residue._atom_indices, dtype=np.int64)] = new_residue_index
+        residue._atom_indices = []
+        self.hierarchy_changed()
 
     # Set a new chain in the structure
     # WARNING: Residues and atoms must be set already before setting chains
@@ -517,100 +724,230 @@ class Structure:
         new_chain_index = len(self.chains)
         self.chains.append(chain)
         chain._index = new_chain_index
+        self._index_chain_name(chain)
         # In case the chain has residue indices, set relational indices on each residue
-        for residue_index in chain.residue_indices:
-            residue = self.residues[residue_index]
-            residue._chain_index = new_chain_index
+        if len(chain._residue_indices) > 0:
+            self._residue_chain_indices[np.asarray(chain._residue_indices, dtype=np.int64)] = new_chain_index
+        chain._residue_indices = []
+        self.hierarchy_changed(residue_atoms=False)
 
     # Purge chain from the structure
     # This can be done only when the chain has no residues left in the structure
     # Renumerate all chain indices which have been offsetted as a result of the purge
     def purge_chain(self, chain: "Chain"):
         # Check the chain can be purged
-        if chain not in self.chains:
+        purged_index = chain.index
+        if chain.structure is not self or purged_index is None or self.chains[purged_index] is not chain:
             raise ValueError(
                 "Chain " + str(chain.name) + " is not in the structure already"
             )
-        if len(chain.residue_indices) > 0:
+        if self.chain_has_residues(purged_index):
             raise ValueError(
                 "Chain " + str(chain.name) + " is still having residues and thus it cannot be purged"
             )
-        # Get the current index of the chain to be purged
-        purged_index = chain.index
         # Chains and their residues below this index are not to be modified
         # Chains and their residues over this index must be renumerated
         for affected_chain in self.chains[purged_index + 1:]:
-            # Chaging the index automatically changes all chain residues '_chain_index' values.
-            affected_chain.index -= 1
+            affected_chain._index -= 1
+        residue_chain_indices = self.residue_chain_indices
+        residue_chain_indices[residue_chain_indices > purged_index] -= 1
+        self.hierarchy_changed(residue_atoms=False)
         # Finally, remove the current chain from the list of chains in the structure
-        self.chains.remove(chain)
+        self._unindex_chain_name(chain)
+        del self.chains[purged_index]
+        chain._structure = None
+        chain._index = None
+
+    # Add a chain to the chain name index
+    def _index_chain_name(self, chain: "Chain"):
+        name_chains = self._chains_by_name.setdefault(chain.name, [])
+        insort(name_chains, chain, key=lambda name_chain: name_chain.index)
+        # If this is the first chain with this name then the name is not free anymore
+        if len(name_chains) == 1 and chain.name in self._free_chain_names:
+            self._free_chain_names.remove(chain.name)
+
+    # Remove a chain from the chain name index
+    def _unindex_chain_name(self, chain: "Chain"):
+        # Note that chains are compared by identity here, since chains with the same name are equal
+        name_chains = self._chains_by_name[chain.name]
+        name_chains[:] = [name_chain for name_chain in name_chains if name_chain is not chain]
+        # If this was the last chain with this name then the name is free again
+        if len(name_chains) == 0:
+            del self._chains_by_name[chain.name]
+            if chain.name in available_caps:
+                insort(self._free_chain_names, chain.name)
 
     # Set the structure from a pdb file
+    # The whole file is read at once and atom fields are sliced from fixed-width columns in a single pass
+    # Residues and chains are then built from the changes between consecutive atom fields
     @classmethod
     def from_pdb_file(cls, pdb_filename: str):
         if not os.path.exists(pdb_filename):
             raise SystemExit('File "' + pdb_filename + '" not found')
-        # Read the pdb file line by line and set the parsed atoms, residues and chains
-        parsed_atoms = []
-        parsed_residues: list[Residue] = []
-        parsed_chains: list[Chain] = []
-        atom_index = -1
-        residue_index = -1
-        with open(pdb_filename, "r") as file:
+        with open(pdb_filename, "rb") as file:
+            content = file.read()
+        # Parse atoms only
+        atom_lines = [
+            line for line in content.splitlines() if line[0:6] == b"ATOM  " or line[0:6] == b"HETATM"
+        ]
+        if len(atom_lines) == 0:
+            return cls()
+        # Set a table of characters with one row per atom line
+        # Columns are sliced according to characters, so non-ascii files are decoded first
+        if content.isascii():
+            padded_lines = b"".join([line[0:80].ljust(80) for line in atom_lines])
+            table = np.frombuffer(padded_lines, dtype="S1").reshape(-1, 80)
+        else:
+            decoded_lines = [line.decode("utf-8")[0:80].ljust(80) for line in atom_lines]
+            table = np.array(decoded_lines, dtype="U80").view("U1").reshape(-1, 80)
+        # Release the raw file content as soon as possible to reduce the peak memory
+        del content, atom_lines
+        # Mine all atom data
+        atom_names, _ = _get_table_strings(table, 11, 16)
+        residue_names, residue_name_codes = _get_table_strings(table, 17, 21)
+        chain_names, chain_codes = _get_table_strings(table, 21, 22, strip=False)
+        icodes, icode_codes = _get_table_strings(table, 26, 27)
+        elements, _ = _get_table_strings(table, 77, 79)
+        residue_numbers = _get_table_column(table, 22, 26).astype(np.int64)
+        coords = np.empty((len(table), 3), dtype=np.float64)
+        coords[:, 0] = _get_table_column(table, 30, 38).astype(np.float64)
+        coords[:, 1] = _get_table_column(table, 38, 46).astype(np.float64)
+        coords[:, 2] = _get_table_column(table, 46, 54).astype(np.float64)
+        return cls._from_atom_fields(
+            atom_names, elements, residue_names, residue_name_codes, residue_numbers,
+            icodes, icode_codes, chain_names, chain_codes, coords,
+        )
+
+    # Set the structure from a mmcif file
+    # The file is streamed line by line and only the atom site fields which are needed are kept
+    # Author fields are preferred over label fields, as they are the ones in pdb files
+    # Note that all models are read, as it is done with pdb files
+    @classmethod
+    def from_cif_file(cls, cif_filename: str):
+        if not os.path.exists(cif_filename):
+            raise SystemExit('File "' + cif_filename + '" not found')
+        field_names: list[str] = []
+        rows: list[tuple[str, ...]] = []
+        with open(cif_filename, "r") as file:
+            # Find the atom site loop header
+            in_loop_header = False
             for line in file:
-                # Parse atoms only
-                start = line[0:6]
-                is_atom = start == "ATOM  " or start == "HETATM"
-                if not is_atom:
-                    continue
-                # Mine all atom data
-                atom_name = line[11:16].strip()
-                residue_name = line[17:21].strip()
-                chain = line[21:22]
-                residue_number = int(line[22:26])
-                icode = line[26:27]
-                if icode == " ":
-                    icode = ""
-                x_coord = float(line[30:38])
-                y_coord = float(line[38:46])
-                z_coord = float(line[46:54])
-                element = line[77:79].strip()
-                # Set the parsed atom, residue and chain
-                parsed_atom = Atom(
-                    name=atom_name, element=element, coords=(x_coord, y_coord, z_coord)
-                )
-                parsed_residue = Residue(
-                    name=residue_name, number=residue_number, icode=icode
-                )
-                parsed_chain = Chain(name=chain)
-                # Add the parsed atom to the list and update the current atom index
-                parsed_atoms.append(parsed_atom)
-                atom_index += 1
-                # Check if we are in the same chain/residue than before
-                same_chain = parsed_chains and parsed_chains[-1] == parsed_chain
-                same_residue = (
-                    same_chain and parsed_residues and parsed_residue.same_inputs_as(parsed_residues[-1])
-                )
-                # Update the residue atom indices
-                # If the residue equals the last parsed residue then use the previous instead
-                if same_residue:
-                    parsed_residue = parsed_residues[-1]
-                    parsed_residue.atom_indices.append(atom_index)
-                    # If it is the same residue then it will be the same chain as well so we can proceed
-                    continue
-                # Otherwise, include the new residue in the list and update the current residue index
-                parsed_residues.append(parsed_residue)
-                residue_index += 1
-                parsed_residue.atom_indices.append(atom_index)
-                # If the chain equals the last parsed chain then use the previous instead
-                if same_chain:
-                    parsed_chain = parsed_chains[-1]
-                    parsed_chain.residue_indices.append(residue_index)
+                if line.startswith("loop_"):
+                    in_loop_header = True
+                    field_names = []
+                elif in_loop_header and line.startswith("_"):
+                    field_names.append(line.split()[0])
+                elif in_loop_header:
+                    in_loop_header = False
+                    if len(field_names) > 0 and field_names[0].startswith("_atom_site."):
+                        break
+                    field_names = []
+            if len(field_names) == 0:
+                return cls()
+            field_count = len(field_names)
+            # Optional fields which are missing are not picked and they are filled later
+            field_indices = _get_cif_field_indices(field_names)
+            pick_fields = operator.itemgetter(*(index for index in field_indices if index is not None))
+            # Read atom site rows until the loop is over
+            # The line which ended the header is the first row
+            # Rows are usually one per line but they may be also splitted in several lines
+            pending_tokens: list[str] = []
+            for line in itertools.chain([line], file):
+                if line.startswith(CIF_LOOP_ENDINGS):
+                    break
+                tokens = _split_cif_line(line)
+                if len(tokens) == field_count and not pending_tokens:
+                    rows.append(pick_fields(tokens))
                     continue
-                # Otherwise, include the new chain in the list
-                parsed_chains.append(parsed_chain)
-                parsed_chain.residue_indices.append(residue_index)
-        return cls(atoms=parsed_atoms, residues=parsed_residues, chains=parsed_chains)
+                pending_tokens += tokens
+                while len(pending_tokens) >= field_count:
+                    rows.append(pick_fields(pending_tokens[0:field_count]))
+                    pending_tokens = pending_tokens[field_count:]
+        if len(rows) == 0:
+            return cls()
+        # Mine all atom data
+        # Missing optional fields are set as unknown values
+        picked_fields = iter(zip(*rows))
+        atom_names, residue_names, chain_names, residue_numbers, icodes, elements, x_coords, y_coords, z_coords = (
+            next(picked_fields) if index is not None else ("?",) * len(rows) for index in field_indices
+        )
+        del rows
+        # Missing insertion codes and elements may be either '?' or '.'
+        # Missing elements are guessed from atom names
+        elements = [
+            _guess_element(atom_name, residue_name) if element in ("?", ".") else element
+            for element, atom_name, residue_name in zip(elements, atom_names, residue_names)
+        ]
+        atom_names, _ = _factorize(atom_names)
+        residue_names, residue_name_codes = _factorize(residue_names)
+        chain_names, chain_codes = _factorize(chain_names)
+        icodes, icode_codes = _factorize(["" if icode in ("?", ".") else icode for icode in icodes])
+        elements, _ = _factorize(elements)
+        residue_numbers = np.array(residue_numbers)
+        missing_numbers = np.flatnonzero(np.isin(residue_numbers, ("?", ".")))
+        if len(missing_numbers) > 0:
+            raise ValueError("Atom " + str(missing_numbers[0] + 1) + " in mmcif file has no residue number")
+        residue_numbers = residue_numbers.astype(np.int64)
+        coords = np.empty((len(atom_names), 3), dtype=np.float64)
+        coords[:, 0] = np.array(x_coords).astype(np.float64)
+        coords[:, 1] = np.array(y_coords).astype(np.float64)
+        coords[:, 2] = np.array(z_coords).astype(np.float64)
+        return cls._from_atom_fields(
+            atom_names, elements, residue_names, residue_name_codes, residue_numbers,
+            icodes, icode_codes, chain_names, chain_codes, coords,
+        )
+
+    # Set the structure from a pdb or a mmcif file, according to the file extension
+    @classmethod
+    def from_file(cls, filename: str):
+        if filename.lower().endswith(".cif"):
+            return cls.from_cif_file(filename)
+        return cls.from_pdb_file(filename)
+
+    # Set the structure from parsed atom fields, with one value per atom
+    # Codes are equal for equal values and they are used to find where each residue and chain starts
+    @classmethod
+    def _from_atom_fields(
+        cls,
+        atom_names: list[str],
+        elements: list[str],
+        residue_names: list[str],
+        residue_name_codes: np.ndarray,
+        residue_numbers: np.ndarray,
+        icodes: list[str],
+        icode_codes: np.ndarray,
+        chain_names: list[str],
+        chain_codes: np.ndarray,
+        coords: np.ndarray,
+    ):
+        # Find where each chain and residue starts
+        # A new chain starts when the chain changes from the previous atom
+        # A new residue starts when the chain or any residue field changes from the previous atom
+        chain_changes = chain_codes[1:] != chain_codes[:-1]
+        residue_changes = chain_changes.copy()
+        for column in [residue_name_codes, residue_numbers, icode_codes]:
+            residue_changes |= column[1:] != column[:-1]
+        residue_starts = np.concatenate([[0], np.flatnonzero(residue_changes) + 1])
+        residue_ends = np.append(residue_starts[1:], len(atom_names))
+        # Residue starts include chain starts so the first residue of each chain is found this way
+        chain_starts = np.concatenate([[0], np.flatnonzero(chain_changes) + 1])
+        chain_first_residues = np.searchsorted(residue_starts, chain_starts)
+        chain_last_residues = np.append(chain_first_residues[1:], len(residue_starts))
+        # Set the parsed atoms, residues and chains
+        parsed_atoms = [Atom(name=name, element=element) for name, element in zip(atom_names, elements)]
+        parsed_residues = []
+        for start, end in zip(residue_starts.tolist(), residue_ends.tolist()):
+            parsed_residue = Residue(
+                name=residue_names[start], number=int(residue_numbers[start]), icode=icodes[start]
+            )
+            parsed_residue.atom_indices = range(start, end)
+            parsed_residues.append(parsed_residue)
+        parsed_chains = []
+        for start, first, last in zip(chain_starts.tolist(), chain_first_residues.tolist(), chain_last_residues.tolist()):
+            parsed_chain = Chain(name=chain_names[start])
+            parsed_chain.residue_indices = range(first, last)
+            parsed_chains.append(parsed_chain)
+        return cls(atoms=parsed_atoms, residues=parsed_residues, chains=parsed_chains, coords=coords)
 
     # Fix atom elements by gueesing them when missing
     # Set all elements with the first letter upper and the second(if any) lower
@@ -624,39 +961,239 @@ class Structure:
     #             atom.element = guess_name_element(atom.name)
 
     # Generate a pdb file with current structure
+    # Every field is formatted as a whole column and repeated values are formatted only once
+    # Lines are then formatted and written in large chunks
     def generate_pdb_file(self, pdb_filename: str):
+        coords = self.coords
+        missing_coords = np.flatnonzero(np.isnan(coords).any(axis=1))
+        if len(missing_coords) > 0:
+            raise ValueError("Atom " + str(self.atoms[missing_coords[0]]) + " has no coordinates")
+        missing_residues = np.flatnonzero(self.atom_residue_indices < 0)
+        if len(missing_residues) > 0:
+            raise ValueError("Atom " + str(self.atoms[missing_residues[0]]) + " has no residue")
+        occupancy = "1.00"  # Just a placeholder
+        temp_factor = "0.00"  # Just a placeholder
+        # Format the residue name, chain, residue number and icode fields of every residue
+        chains = self.chains
+        residue_fields = [
+            residue.name.ljust(4) + chains[chain_index].name.rjust(1) + str(residue.number).rjust(4) + residue.icode.rjust(1)
+            for residue, chain_index in zip(self.residues, self.residue_chain_indices.tolist())
+        ]
+        # Format atom names and elements once per different value
+        atom_names = [atom.name for atom in self.atoms]
+        name_fields = {
+            name: (" " + str(name).ljust(3) if len(str(name)) < 4 else name)
+            for name in set(atom_names)
+        }
+        atom_elements = [atom.element for atom in self.atoms]
+        different_elements = list(set(atom_elements))
+        element_codes = {element: code for code, element in enumerate(different_elements)}
+        atom_element_codes = np.array([element_codes[element] for element in atom_elements], dtype=np.int64)
+        element_fields = [
+            "  " + occupancy + "  " + temp_factor + "           " + element
+            for element in different_elements
+        ]
+        # Lines are padded up to 80 characters, so the padding is added to the last field
+        # The padding depends on the length of the rest of fields, which are almost always the same
+        atom_residue_fields = [residue_fields[residue_index] for residue_index in self.atom_residue_indices.tolist()]
+        atom_name_fields = [name_fields[name] for name in atom_names]
+        line_lengths = (
+            40 + np.fromiter(map(len, atom_name_fields), dtype=np.int64, count=len(self.atoms))
+            + np.fromiter(map(len, atom_residue_fields), dtype=np.int64, count=len(self.atoms))
+        )
+        line_length_range = int(line_lengths.max()) + 1 if len(line_lengths) > 0 else 1
+        padded_keys, atom_padded_keys = np.unique(
+            atom_element_codes * line_length_range + line_lengths, return_inverse=True
+        )
+        padded_element_fields = [
+            element_fields[key // line_length_range].ljust(80 - key % line_length_range)
+            for key in padded_keys.tolist()
+        ]
+        atom_element_fields = [padded_element_fields[key] for key in atom_padded_keys.ravel().tolist()]
+        # Atom numbers are restarted after 99999
+        atom_numbers = (np.arange(1, len(self.atoms) + 1) % 100000).tolist()
         with open(pdb_filename, "w") as file:
             file.write("REMARK mdtoolbelt generated pdb file\n")
-            for a, atom in enumerate(self.atoms):
-                residue = atom.residue
-                index = str((a + 1) % 100000).rjust(5)
-                name = (
-                    " " + str(atom.name).ljust(3)
-                    if len(str(atom.name)) < 4
-                    else atom.name
+            for start in range(0, len(self.atoms), PDB_WRITE_CHUNK_SIZE):
+                end = start + PDB_WRITE_CHUNK_SIZE
+                chunk_coords = coords[start:end]
+                chunk_fields = zip(
+                    atom_numbers[start:end],
+                    atom_name_fields[start:end],
+                    atom_residue_fields[start:end],
+                    chunk_coords[:, 0].tolist(),
+                    chunk_coords[:, 1].tolist(),
+                    chunk_coords[:, 2].tolist(),
+                    atom_element_fields[start:end],
                 )
-                residue_name = residue.name.ljust(4)
-                chain = atom.chain.name.rjust(1)
-                residue_number = str(residue.number).rjust(4)
-                icode = residue.icode.rjust(1)
-                coords: Optional[Coords] = atom.coords
-                if not coords:
-                    raise ValueError("Atom " + str(atom) + " has no coordinates")
-                else:
-                    x_coord, y_coord, z_coord = [
-                        "{:.3f}".format(coord).rjust(8) for coord in coords
-                    ]
-                occupancy = "1.00"  # Just a placeholder
-                temp_factor = "0.00"  # Just a placeholder
-                element = atom.element
-                atom_line = (
-                    "ATOM  " + str(index) + " " + str(name) + " " + residue_name + chain + residue_number + icode + "   " + x_coord + y_coord + z_coord + "  " + occupancy + "  " + temp_factor + "           " + element
-                ).ljust(80) + "\n"
-                file.write(atom_line)
+                line_template = "ATOM  %5d %s %s   %8.3f%8.3f%8.3f%s\n"
+                file.write((line_template * len(chunk_coords)) % tuple(itertools.chain.from_iterable(chunk_fields)))
+
+    # Generate a mmcif file with current structure
+    # Unlike pdb files, there is no limit in the number of atoms, residues or chains
+    # Fields are formatted as in the pdb writer, once per residue or different value
+    def generate_cif_file(self, cif_filename: str):
+        coords = self.coords
+        missing_coords = np.flatnonzero(np.isnan(coords).any(axis=1))
+        if len(missing_coords) > 0:
+            raise ValueError("Atom " + str(self.atoms[missing_coords[0]]) + " has no coordinates")
+        # Format the label and author residue fields of every residue
+        # Residue numbers are used also as label sequence ids
+        chains = self.chains
+        residue_fields = []
+        for residue, chain_index in zip(self.residues, self.residue_chain_indices.tolist()):
+            name = _format_cif_value(residue.name)
+            chain_name = _format_cif_value(chains[chain_index].name)
+            number = str(residue.number)
+            residue_fields.append((
+                name + " " + chain_name + " ? " + number + " " + _format_cif_value(residue.icode),
+                number + " " + name + " " + chain_name,
+            ))
+        # Format atom names and elements once per different value
+        atom_names = [atom.name for atom in self.atoms]
+        name_fields = {name: _format_cif_value(name) for name in set(atom_names)}
+        atom_elements = [atom.element for atom in self.atoms]
+        element_fields = {element: _format_cif_value(element) for element in set(atom_elements)}
+        atom_residue_fields = [residue_fields[residue_index] for residue_index in self.atom_residue_indices.tolist()]
+        atom_name_fields = [name_fields[name] for name in atom_names]
+        atom_element_fields = [element_fields[element] for element in atom_elements]
+        with open(cif_filename, "w") as file:
+            file.write("data_structure\n#\nloop_\n")
+            for field_name in CIF_WRITE_FIELDS:
+                file.write("_atom_site." + field_name + "\n")
+            for start in range(0, len(self.atoms), PDB_WRITE_CHUNK_SIZE):
+                end = start + PDB_WRITE_CHUNK_SIZE
+                chunk_coords = coords[start:end]
+                chunk_residue_fields = atom_residue_fields[start:end]
+                chunk_name_fields = atom_name_fields[start:end]
+                chunk_fields = zip(
+                    range(start + 1, start + len(chunk_coords) + 1),
+                    atom_element_fields[start:end],
+                    chunk_name_fields,
+                    [fields[0] for fields in chunk_residue_fields],
+                    chunk_coords[:, 0].tolist(),
+                    chunk_coords[:, 1].tolist(),
+                    chunk_coords[:, 2].tolist(),
+                    [fields[1] for fields in chunk_residue_fields],
+                    chunk_name_fields,
+                )
+                line_template = "ATOM %d %s %s . %s %.3f %.3f %.3f 1.00 0.00 %s %s 1\n"
+                file.write((line_template * len(chunk_coords)) % tuple(itertools.chain.from_iterable(chunk_fields)))
+            file.write("#\n")
+
+    # Generate a pdb or a mmcif file with current structure, according to the file extension
+    def generate_file(self, filename: str):
+        if filename.lower().endswith(".cif"):
+            self.generate_cif_file(filename)
+        else:
+            self.generate_pdb_file(filename)
+
+    # Generate a binary structure file with current structure
+    # Every atom and residue field is stored as a column array and strings are stored as codes
+    # Return the content hash, which is also written in the file header
+    def generate_binary_file(self, binary_filename: str) -> str:
+        atom_names, atom_name_codes = _encode_strings([atom.name for atom in self.atoms])
+        elements, atom_element_codes = _encode_strings([atom.element for atom in self.atoms])
+        residue_names, residue_name_codes = _encode_strings([residue.name for residue in self.residues])
+        icodes, residue_icode_codes = _encode_strings([residue.icode for residue in self.residues])
+        residue_numbers = np.fromiter(
+            (BINARY_MISSING_NUMBER if residue.number is None else residue.number for residue in self.residues),
+            dtype=np.int64, count=len(self.residues)
+        )
+        columns = {
+            "coords": self.coords,
+            "atom_residue_indices": self.atom_residue_indices,
+            "atom_name_codes": atom_name_codes,
+            "atom_element_codes": atom_element_codes,
+            "residue_chain_indices": self.residue_chain_indices,
+            "residue_numbers": residue_numbers,
+            "residue_name_codes": residue_name_codes,
+            "residue_icode_codes": residue_icode_codes,
+        }
+        strings = {
+            "atom_names": atom_names,
+            "elements": elements,
+            "residue_names": residue_names,
+            "icodes": icodes,
+            "chain_names": [chain.name for chain in self.chains],
+        }
+        # Set where each column is to be written, relative to the end of the header
+        column_headers = {}
+        offset = 0
+        for column_name, column in columns.items():
+            column = np.ascontiguousarray(column, dtype=column.dtype.newbyteorder("<"))
+            columns[column_name] = column
+            column_headers[column_name] = {"dtype": column.dtype.str, "shape": list(column.shape), "offset": offset}
+            offset += _align_binary_offset(column.nbytes)
+        # The content hash covers strings and columns, so it does not depend on the file layout
+        content_hash = hashlib.sha256(json.dumps(strings, sort_keys=True).encode())
+        for column in columns.values():
+            content_hash.update(column.reshape(-1).view(np.uint8))
+        header = {
+            "version": BINARY_FORMAT_VERSION,
+            "hash": content_hash.hexdigest(),
+            "atoms": len(self.atoms),
+            "residues": len(self.residues),
+            "chains": len(self.chains),
+            "strings": strings,
+            "columns": column_headers,
+        }
+        # Header is padded so columns are aligned and they can be memory mapped
+        header_bytes = json.dumps(header).encode()
+        header_bytes = header_bytes.ljust(_align_binary_offset(len(BINARY_MAGIC) + 8 + len(header_bytes)) - len(BINARY_MAGIC) - 8)
+        with open(binary_filename, "wb") as file:
+            file.write(BINARY_MAGIC)
+            file.write(len(header_bytes).to_bytes(8, "little"))
+            file.write(header_bytes)
+            for column in columns.values():
+                file.write(column.reshape(-1).view(np.uint8))
+                file.write(bytes(_align_binary_offset(column.nbytes) - column.nbytes))
+        return header["hash"]
+
+    # Set the structure from a binary structure file
+    # Coordinates are memory mapped as copy-on-write, so they are read from disk only when they are used
+    # Content is checked against the header hash only if verification is requested
+    @classmethod
+    def from_binary_file(cls, binary_filename: str, verify: bool = False):
+        header = read_binary_header(binary_filename)
+        columns = read_binary_columns(binary_filename, copy_on_write=True)
+        if verify:
+            content_hash = hashlib.sha256(json.dumps(header["strings"], sort_keys=True).encode())
+            for column in columns.values():
+                content_hash.update(np.ascontiguousarray(column).reshape(-1).view(np.uint8))
+            if content_hash.hexdigest() != header["hash"]:
+                raise ValueError('Binary structure file "' + binary_filename + '" content does not match its hash')
+        strings = header["strings"]
+        structure = cls()
+        # Atoms and residues are set directly in the structure arrays, which are already consistent
+        structure._coords = columns["coords"]
+        structure._atom_residue_indices = np.array(columns["atom_residue_indices"])
+        structure._residue_chain_indices = np.array(columns["residue_chain_indices"])
+        atom_names = [strings["atom_names"][code] for code in columns["atom_name_codes"].tolist()]
+        elements = [strings["elements"][code] for code in columns["atom_element_codes"].tolist()]
+        for atom_index, (name, element) in enumerate(zip(atom_names, elements)):
+            atom = Atom(name=name, element=element)
+            atom._structure = structure
+            atom._index = atom_index
+            structure.atoms.append(atom)
+        residue_names = [strings["residue_names"][code] for code in columns["residue_name_codes"].tolist()]
+        icodes = [strings["icodes"][code] for code in columns["residue_icode_codes"].tolist()]
+        residue_numbers = columns["residue_numbers"].tolist()
+        for residue_index, (name, number, icode) in enumerate(zip(residue_names, residue_numbers, icodes)):
+            residue = Residue(name=name, number=None if number == BINARY_MISSING_NUMBER else number, icode=icode)
+            residue._structure = structure
+            residue._index = residue_index
+            structure.residues.append(residue)
+        for chain_name in strings["chain_names"]:
+            structure.set_new_chain(Chain(name=chain_name))
+        structure.hierarchy_changed()
+        return structure
 
     # Get a chain by its name
+    # If several chains have the same name then return the first one
     def get_chain_by_name(self, name: str) -> Optional[Chain]:
-        return next((c for c in self.chains if c.name == name), None)
+        name_chains = self._chains_by_name.get(name)
+        return name_chains[0] if name_chains else None
 
     # Get a summary of the structure
     def display_summary(self):
@@ -672,45 +1209,344 @@ class Structure:
     # This is an alternative system to find protein chains(anything else is chained as 'X')
     # This system does not depend on VMD
     # It totally overrides previous chains since it is expected to be used only when chains are missing
+    # Alpha carbons of all residues are gathered at once and consecutive distances are calculated in a single operation
     def raw_protein_chainer(self):
-        current_chain = self.get_next_available_chain_name()
-        previous_alpha_carbon = None
-        for residue in self.residues:
-            alpha_carbon = next(
-                (atom for atom in residue.atoms if atom.name == "CA"), None
+        # Find the first alpha carbon of each residue
+        is_alpha_carbon = np.fromiter(
+            (atom.name == "CA" for atom in self.atoms), dtype=bool, count=len(self.atoms)
+        )
+        alpha_carbon_atom_indices = np.flatnonzero(is_alpha_carbon & (self.atom_residue_indices != -1))
+        alpha_carbon_residue_indices, first_alpha_carbons = np.unique(
+            self.atom_residue_indices[alpha_carbon_atom_indices], return_index=True
+        )
+        alpha_carbon_coords = self.coords[alpha_carbon_atom_indices[first_alpha_carbons]]
+        # Connected aminoacids have their alpha carbons at a distance of around 3.8 Ångstroms
+        # Residues with no alpha carbon are skipped, so each alpha carbon is compared with the previous alpha carbon
+        # Note that alpha carbons with no coordinates are considered to be connected
+        distances = calculate_distances(alpha_carbon_coords[:-1], alpha_carbon_coords[1:])
+        residues_are_connected = np.concatenate([[False], np.nan_to_num(distances) < 4])
+        # Set the chain name of each residue
+        # Residues with no alpha carbon are chained as 'X' and thus 'X' is no longer available after the first one
+        # Each group of connected residues gets the next available chain name
+        # If there are no chain names left then residues keep their current chain
+        residue_chain_names: list[Optional[str]] = ["X"] * len(self.residues)
+        available_chain_names = list(self._free_chain_names)
+        first_residue_with_no_alpha_carbon = next(
+            (r for r, residue_index in enumerate(alpha_carbon_residue_indices.tolist()) if r != residue_index),
+            len(alpha_carbon_residue_indices),
+        )
+        current_chain = None
+        for residue_index, is_connected in zip(alpha_carbon_residue_indices.tolist(), residues_are_connected.tolist()):
+            if not is_connected:
+                if residue_index > first_residue_with_no_alpha_carbon and "X" in available_chain_names:
+                    available_chain_names.remove("X")
+                current_chain = available_chain_names.pop(0) if available_chain_names else None
+            residue_chain_names[residue_index] = current_chain
+        self.rechain_residues(residue_chain_names)
+
+    # Bulk edits
+    # Plans have one value per residue in the structure, where None means the residue is not changed
+    # The whole plan is checked before changing anything, so an invalid plan leaves the structure untouched
+    # Then the plan is applied in a single pass and the hierarchy is updated only once at the end
+
+    # Check a bulk edit plan has one value per residue and every value is of the expected type
+    def _check_residues_plan(self, plan: Sequence, expected_type: Union[type, tuple], plan_name: str):
+        if len(plan) != len(self.residues):
+            raise ValueError(
+                "The " + plan_name + " plan has " + str(len(plan)) + " values but there are " + str(len(self.residues)) + " residues"
             )
-            if not alpha_carbon:
-                residue.set_chain("X")
+        for residue_index, value in enumerate(plan):
+            if value is not None and not isinstance(value, expected_type):
+                raise ValueError(
+                    "Wrong " + plan_name + " value for residue " + str(residue_index) + ": " + str(value)
+                )
+
+    # Set new residue numbers and, optionally, new insertion codes at once
+    def renumber_residues(
+        self,
+        residue_numbers: Sequence[Optional[int]],
+        residue_icodes: Optional[Sequence[Optional[str]]] = None,
+    ):
+        self._check_residues_plan(residue_numbers, (int, np.integer), "residue numbers")
+        if residue_icodes is not None:
+            self._check_residues_plan(residue_icodes, str, "residue icodes")
+        for residue, residue_number in zip(self.residues, residue_numbers):
+            if residue_number is not None:
+                residue.number = int(residue_number)
+        if residue_icodes is None:
+            return
+        for residue, residue_icode in zip(self.residues, residue_icodes):
+            if residue_icode is not None:
+                residue.icode = residue_icode
+
+    # Move residues to the chains with the specified names at once
+    # Chains which do not exist yet are created in the same order they are found
+    # Chains which run out of residues are purged
+    def rechain_residues(self, residue_chain_names: Sequence[Optional[str]]):
+        self._check_residues_plan(residue_chain_names, str, "chain names")
+        current_residue_chain_indices = self.residue_chain_indices.copy()
+        new_residue_chain_indices = current_residue_chain_indices.copy()
+        # Find the index of every target chain, creating chains when necessary
+        chain_indices: dict[Optional[str], int] = {}
+        for residue_index, chain_name in enumerate(residue_chain_names):
+            if chain_name is None:
                 continue
-            # Connected aminoacids have their alpha carbons at a distance of around 3.8 Ångstroms
-            residues_are_connected = (
-                previous_alpha_carbon and calculate_distance(previous_alpha_carbon, alpha_carbon) < 4
-            )
-            if not residues_are_connected:
-                current_chain = self.get_next_available_chain_name()
-            if current_chain:
-                residue.set_chain(current_chain)
-            previous_alpha_carbon = alpha_carbon
+            chain_index = chain_indices.get(chain_name)
+            if chain_index is None:
+                chain = self.get_chain_by_name(chain_name)
+                if not chain:
+                    chain = Chain(name=chain_name)
+                    self.set_new_chain(chain)
+                chain_index = chain_indices[chain_name] = chain.index
+            new_residue_chain_indices[residue_index] = chain_index
+        self.residue_chain_indices[:] = new_residue_chain_indices
+        self.hierarchy_changed(residue_atoms=False)
+        # Purge chains which had residues before and have none now
+        # Chains are purged from the last to the first so pending chain indices are not altered
+        chains_count = len(self.chains)
+        residues_before = np.bincount(current_residue_chain_indices[current_residue_chain_indices != -1], minlength=chains_count)
+        residues_after = np.bincount(new_residue_chain_indices[new_residue_chain_indices != -1], minlength=chains_count)
+        for chain_index in reversed(np.flatnonzero((residues_before > 0) & (residues_after == 0)).tolist()):
+            self.purge_chain(self.chains[chain_index])
 
     # Get the next available chain name
     # Find alphabetically the first letter which is not yet used as a chain name
     # If all letters in the alphabet are used already then return None
+    # Free names are kept sorted by the structure as chains are added, renamed or purged
     def get_next_available_chain_name(self) -> Optional[str]:
-        current_chain_names = [chain.name for chain in self.chains]
-        return next(
-            (name for name in available_caps if name not in current_chain_names), None
-        )
+        return self._free_chain_names[0] if self._free_chain_names else None
+
+
+# Grow an array by doubling its length, so adding rows one by one has a constant amortized cost
+def _grow(array: np.ndarray) -> np.ndarray:
+    new_array = np.empty((max(2 * len(array), 1), *array.shape[1:]), dtype=array.dtype)
+    new_array[: len(array)] = array
+    return new_array
+
+
+# Group element indices by their group index
+# Return offsets and indices in CSR format, so indices of group 'g' are indices[offsets[g]:offsets[g+1]]
+# Indices keep their order inside each group and elements with group index -1 are left out
+def _group_indices(group_indices: np.ndarray, groups_count: int) -> tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(group_indices, kind="stable")
+    ungrouped_count = np.count_nonzero(group_indices == -1)
+    indices = order[ungrouped_count:]
+    counts = np.bincount(group_indices[indices], minlength=groups_count)
+    offsets = np.zeros(groups_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    indices.flags.writeable = False
+    return offsets, indices
+
+
+# Get a fixed-width column from a table of characters as a single array of strings
+def _get_table_column(table: np.ndarray, start: int, end: int) -> np.ndarray:
+    column = np.ascontiguousarray(table[:, start:end])
+    return column.view(column.dtype.kind + str(end - start)).ravel()
+
+
+# Get a fixed-width column from a table of characters as a list of python strings
+# Each different value is decoded only once and all its occurrences share the same string
+# Return also an array with a code for each string, so equal strings have equal codes
+def _get_table_strings(
+    table: np.ndarray, start: int, end: int, strip: bool = True
+) -> tuple[list[str], np.ndarray]:
+    column = _get_table_column(table, start, end)
+    values, inverse = np.unique(column, return_inverse=True)
+    strings = []
+    for value in values.tolist():
+        if isinstance(value, bytes):
+            value = value.decode("ascii")
+        strings.append(value.strip() if strip else value)
+    # Different values may become the same string once they are stripped
+    string_codes: dict[str, int] = {}
+    value_codes = np.array([string_codes.setdefault(string, len(string_codes)) for string in strings])
+    inverse = inverse.ravel()
+    return [strings[index] for index in inverse.tolist()], value_codes[inverse]
+
+
+# Get equal strings in a list of strings as the same string instance
+# Return also an array with a code for each string, so equal strings have equal codes
+def _factorize(values: Sequence[str]) -> tuple[list[str], np.ndarray]:
+    if len(values) == 0:
+        return [], np.empty(0, dtype=np.int64)
+    unique_values, codes = np.unique(np.array(values), return_inverse=True)
+    codes = codes.ravel()
+    strings = unique_values.tolist()
+    return [strings[code] for code in codes.tolist()], codes
+
+
+# Fields in the mmcif atom site loop which are read by the structure, in the order they are returned
+# Several alternative fields are set for each value, from the preferred to the fallback
+# Fields in CIF_OPTIONAL_ATOM_SITE_FIELDS may be missing, then insertion codes are blank and elements are guessed
+CIF_ATOM_SITE_FIELDS = [
+    ("auth_atom_id", "label_atom_id"),
+    ("auth_comp_id", "label_comp_id"),
+    ("auth_asym_id", "label_asym_id"),
+    ("auth_seq_id", "label_seq_id"),
+    ("pdbx_PDB_ins_code",),
+    ("type_symbol",),
+    ("Cartn_x",),
+    ("Cartn_y",),
+    ("Cartn_z",),
+]
+CIF_OPTIONAL_ATOM_SITE_FIELDS = ["pdbx_PDB_ins_code", "type_symbol"]
+
+# Fields in the mmcif atom site loop which are written by the structure, in the order they are written
+CIF_WRITE_FIELDS = [
+    "group_PDB", "id", "type_symbol", "label_atom_id", "label_alt_id", "label_comp_id", "label_asym_id",
+    "label_entity_id", "label_seq_id", "pdbx_PDB_ins_code", "Cartn_x", "Cartn_y", "Cartn_z", "occupancy",
+    "B_iso_or_equiv", "auth_seq_id", "auth_comp_id", "auth_asym_id", "auth_atom_id", "pdbx_PDB_model_num",
+]
+
+# Lines which end a mmcif loop
+CIF_LOOP_ENDINGS = ("_", "#", "loop_", "data_")
+
+# Quoted mmcif values or any other sequence of non-blank characters
+# Note that a quote is closing only when it is followed by a blank character
+_cif_token = re.compile(r"""'(?:[^']|'(?=\S))*'|"(?:[^"]|"(?=\S))*"|\S+""")
+
+
+# Split a mmcif line in values, removing their quotes
+def _split_cif_line(line: str) -> list[str]:
+    if "'" not in line and '"' not in line:
+        return line.split()
+    return [
+        token[1:-1] if len(token) > 1 and token[0] in "'\"" and token[-1] == token[0] else token
+        for token in _cif_token.findall(line)
+    ]
+
+
+# Find the position of each atom site field which is read by the structure
+# The position of optional fields which are missing is None
+def _get_cif_field_indices(field_names: list[str]) -> list[Optional[int]]:
+    field_indices: list[Optional[int]] = []
+    for alternatives in CIF_ATOM_SITE_FIELDS:
+        field_name = next((
+            "_atom_site." + alternative for alternative in alternatives
+            if "_atom_site." + alternative in field_names
+        ), None)
+        if not field_name:
+            if alternatives[0] in CIF_OPTIONAL_ATOM_SITE_FIELDS:
+                field_indices.append(None)
+                continue
+            raise ValueError("Missing mmcif atom site field " + alternatives[0])
+        field_indices.append(field_names.index(field_name))
+    return field_indices
+
+
+# Guess the element of an atom from its name
+# Atoms named as their residue (e.g. 'ZN' in 'ZN' ions) are single atom residues and their name is the element
+# Otherwise the element is the first letter of the name, as in the standard aminoacid and nucleic acid atom names
+def _guess_element(atom_name: str, residue_name: str) -> str:
+    letters = "".join(character for character in atom_name if character.isalpha())
+    if not letters:
+        return ""
+    if len(letters) == 2 and atom_name == residue_name:
+        return letters.upper()
+    return letters[0].upper()
+
+
+# Format a value to be written in a mmcif file, adding quotes when needed
+def _format_cif_value(value: Optional[str]) -> str:
+    if value is None or value == "":
+        return "."
+    if value in (".", "?") or value[0] in "_#$'\";[]" or any(character.isspace() for character in value):
+        return '"' + value + '"' if "'" in value else "'" + value + "'"
+    return value
 
 
 # Calculate the distance between two atoms
 def calculate_distance(atom_1: Atom, atom_2: Atom) -> float:
-    squared_distances_sum = 0.0
-    if atom_1.coords is not None and atom_2.coords is not None:
-        for i in {"x": 0, "y": 1, "z": 2}.values():
-            squared_distances_sum += (atom_1.coords[i] - atom_2.coords[i]) ** 2
-    return math.sqrt(squared_distances_sum)
+    if atom_1.coords is None or atom_2.coords is None:
+        return 0.0
+    return float(np.linalg.norm(np.subtract(atom_1.coords, atom_2.coords)))
+
+
+# Calculate the distances between two groups of coordinates row by row
+# e.g. the distance between each atom and the next atom is calculate_distances(coords[:-1], coords[1:])
+def calculate_distances(coords_1: np.ndarray, coords_2: np.ndarray) -> np.ndarray:
+    return np.sqrt(np.sum((coords_1 - coords_2) ** 2, axis=1))
+
+
+# Binary structure files start with this magic string and then the header length
+# Increase the version every time the binary format is changed
+BINARY_MAGIC = b"BIOBBSTR"
+BINARY_FORMAT_VERSION = 1
+# Columns in binary structure files are aligned to this number of bytes
+BINARY_ALIGNMENT = 64
+# Residue numbers can not be null in a column so missing numbers are stored as this value
+BINARY_MISSING_NUMBER = np.iinfo(np.int64).min
+
+
+# Get the smallest aligned size for a binary structure file which is not below the given size
+def _align_binary_offset(size: int) -> int:
+    return -(-size // BINARY_ALIGNMENT) * BINARY_ALIGNMENT
+
+
+# Read the header of a binary structure file
+def read_binary_header(binary_filename: str) -> dict:
+    if not os.path.exists(binary_filename):
+        raise SystemExit('File "' + binary_filename + '" not found')
+    with open(binary_filename, "rb") as file:
+        if file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError('File "' + binary_filename + '" is not a binary structure file')
+        header_length = int.from_bytes(file.read(8), "little")
+        header = json.loads(file.read(header_length))
+    if header["version"] != BINARY_FORMAT_VERSION:
+        raise ValueError(
+            'Binary structure file "' + binary_filename + '" has version ' + str(header["version"])
+            + " but version " + str(BINARY_FORMAT_VERSION) + " is expected"
+        )
+    header["data_offset"] = len(BINARY_MAGIC) + 8 + header_length
+    return header
+
+
+# Memory map columns of a binary structure file, so only the parts which are used are read from disk
+# Column arrays are read only unless they are mapped as copy-on-write, which never modifies the file
+# Available columns are coords, atom_residue_indices, atom_name_codes, atom_element_codes,
+# residue_chain_indices, residue_numbers, residue_name_codes and residue_icode_codes
+def read_binary_columns(
+    binary_filename: str, column_names: Optional[list[str]] = None, copy_on_write: bool = False
+) -> dict[str, np.ndarray]:
+    header = read_binary_header(binary_filename)
+    column_headers = header["columns"]
+    columns = {}
+    for column_name in column_names or list(column_headers):
+        if column_name not in column_headers:
+            raise ValueError("Binary structure files have no column " + column_name)
+        column_header = column_headers[column_name]
+        shape = tuple(column_header["shape"])
+        # Empty columns can not be memory mapped
+        if np.prod(shape) == 0:
+            columns[column_name] = np.empty(shape, dtype=column_header["dtype"])
+            continue
+        columns[column_name] = np.memmap(
+            binary_filename, dtype=column_header["dtype"], mode="c" if copy_on_write else "r",
+            offset=header["data_offset"] + column_header["offset"], shape=shape,
+        )
+    return columns
+
+
+# Get equal strings in a list as codes, which are positions in a list of different strings
+# Unlike '_factorize', strings may be also None
+def _encode_strings(values: list[Optional[str]]) -> tuple[list[Optional[str]], np.ndarray]:
+    string_codes: dict[Optional[str], int] = {}
+    codes = np.fromiter(
+        (string_codes.setdefault(value, len(string_codes)) for value in values), dtype=np.int32, count=len(values)
+    )
+    return list(string_codes), codes
 
 
+# UniProt proteins API, where references are requested by appending the accession
+UNIPROT_API_URL = "https://www.ebi.ac.uk/proteins/api/proteins/"
+# Seconds to wait for a UniProt response before the request fails
+UNIPROT_REQUEST_TIMEOUT = 60
+# Maximum number of UniProt requests which are sent at the same time
+UNIPROT_MAX_CONCURRENCY = 8
+
+# Number of atom lines to be formatted and written together when generating a pdb file
+PDB_WRITE_CHUNK_SIZE = 100000
+
 # Set all available chains according to pdb standards
 available_caps = [
     "A",
@@ -873,9 +1709,14 @@ def residue_name_2_letter(residue_name: str, residue_types: str = "all") -> str:
 # For each reference, align the reference sequence with the topology sequence
 # Chains which do not match any reference sequence will be blasted
 # Note that an internet connection is required both to retireve the uniprot reference sequence and to do the blast
-# NEVER FORGET: This system relies on the fact that topology chains are not repeated
+# Chains with identical sequences (e.g. in homo-oligomers) are aligned and blasted once and share the same match
 def generate_map_online(
-    structure: "Structure", forced_references: list[str] = []
+    structure: "Structure",
+    forced_references: list[str] = [],
+    uniprot_cache: Optional[UniprotCache] = None,
+    uniprot_fasta_index: Optional[UniprotFastaIndex] = None,
+    num_workers: int = 1,
+    alignment_memo: Optional[AlignmentMemo] = None,
 ) -> Optional[dict]:
     # Store all the references which are got through this process
     # Note that not all references may be used at the end
@@ -884,11 +1725,15 @@ def generate_map_online(
     structure_sequences = get_chain_sequences(structure)
     # Find out which chains are protein
     protein_sequences = []
+    # Chains with identical sequences (e.g. in homo-oligomers) are aligned only once
+    # Keep the first chain of every different sequence, which is the one to be aligned
+    unique_protein_sequences: dict[str, dict] = {}
     for structure_sequence in structure_sequences:
         sequence = structure_sequence["sequence"]
         if next((letter for letter in sequence if letter != "X"), None):
             structure_sequence["match"] = {"ref": None, "map": None, "score": 0}
             protein_sequences.append(structure_sequence)
+            unique_protein_sequences.setdefault(sequence, structure_sequence)
     # For each input forced reference, get the reference sequence
     reference_sequences = {}
     if forced_references:
@@ -897,38 +1742,56 @@ def generate_map_online(
             raise TypeError(
                 "Forced references should be a list and not a string a this point"
             )
-        for uniprot_id in forced_references:
-            reference = get_uniprot_reference(uniprot_id)
+        for reference in get_uniprot_references(forced_references, uniprot_cache, uniprot_fasta_index):
             reference_sequences[reference["uniprot"]] = reference["sequence"]
             # Save the current whole reference object for later
             references[reference["uniprot"]] = reference
 
+    # Alignment results of every sequence with every reference, by sequence and reference
+    # They are kept between matches so each sequence and reference pair is aligned only once
+    alignment_matrix: dict[tuple[str, str], Optional[tuple[list, float]]] = {}
+
     # Try to match all protein sequences with the available reference sequences
     # In case of match, objects in the 'protein_sequences' list are modified by adding the result
     # Finally, return True if all protein sequences were matched with the available reference sequences or False if not
     def match_sequences() -> bool:
         # Track each chain-reference alignment match and keep the score of successful alignments
         # Now for each structure sequence, align all reference sequences and keep the best alignment(if it meets the minimum)
+        # Pairs which were already aligned are skipped, since their results were already considered in a previous match
+        # The best match is the same anyway, since equal scores are replaced by the latest reference in both cases
+        new_pairs = [
+            (sequence, uniprot_id)
+            for sequence in unique_protein_sequences
+            for uniprot_id in reference_sequences
+            if (sequence, uniprot_id) not in alignment_matrix
+        ]
+        # Align the structure sequences with the reference sequences
+        new_results = align_pairs(
+            [reference_sequences[uniprot_id] for _, uniprot_id in new_pairs],
+            [sequence for sequence, _ in new_pairs],
+            num_workers,
+            alignment_memo,
+        )
+        alignment_matrix.update(zip(new_pairs, new_results))
+        for (sequence, uniprot_id), align_results in zip(new_pairs, new_results):
+            structure_sequence = unique_protein_sequences[sequence]
+            if not align_results:
+                continue
+            # In case we have a valid alignment, check the alignment score is better than the current reference score(if any)
+            sequence_map, align_score = align_results
+            current_reference = structure_sequence["match"]
+            if current_reference["score"] > align_score:
+                continue
+            reference = references[uniprot_id]
+            # If the alignment is better then we impose the new reference
+            structure_sequence["match"] = {
+                "ref": reference,
+                "map": sequence_map,
+                "score": align_score,
+            }
+        # Then copy the match to the rest of chains with the same sequence
         for structure_sequence in protein_sequences:
-            for uniprot_id, reference_sequence in reference_sequences.items():
-                # Align the structure sequence with the reference sequence
-                align_results = align(
-                    reference_sequence, structure_sequence["sequence"]
-                )
-                if not align_results:
-                    continue
-                # In case we have a valid alignment, check the alignment score is better than the current reference score(if any)
-                sequence_map, align_score = align_results
-                current_reference = structure_sequence["match"]
-                if current_reference["score"] > align_score:
-                    continue
-                reference = references[uniprot_id]
-                # If the alignment is better then we impose the new reference
-                structure_sequence["match"] = {
-                    "ref": reference,
-                    "map": sequence_map,
-                    "score": align_score,
-                }
+            structure_sequence["match"] = unique_protein_sequences[structure_sequence["sequence"]]["match"]
         # Sum up the current matching
         print("Reference summary:")
         for structure_sequence in structure_sequences:
@@ -955,20 +1818,23 @@ def generate_map_online(
     if match_sequences():
         return format_topology_data(structure, protein_sequences)
     # If there are still any chain which is not matched with a reference then we need more references
-    # To get them, we run a blast with each orphan chain sequence
-    for structure_sequence in protein_sequences:
-        # Skip already references chains
-        if structure_sequence["match"]["ref"]:
-            continue
-        # Run the blast
-        sequence = structure_sequence["sequence"]
-        # uniprot_id = blast(sequence)[0]
-        uniprot_id = blast(sequence)  # type: ignore
-        # Build a new reference from the resulting uniprot
-        reference = get_uniprot_reference(uniprot_id)  # type: ignore
-        reference_sequences[reference["uniprot"]] = reference["sequence"]
-        # Save the current whole reference object for later
-        references[reference["uniprot"]] = reference
+    # To get them, we run a blast with all orphan chain sequences at once
+    # When references are resolved offline, the local FASTA file is searched instead
+    orphan_sequences = [
+        sequence for sequence, structure_sequence in unique_protein_sequences.items()
+        if not structure_sequence["match"]["ref"]
+    ]
+    uniprot_ids = blast_sequences(orphan_sequences, uniprot_fasta_index)
+    # Build new references from the resulting uniprots
+    new_uniprot_ids = [
+        uniprot_id for uniprot_id in dict.fromkeys(uniprot_ids)
+        if uniprot_id and uniprot_id not in references
+    ]
+    if new_uniprot_ids:
+        for reference in get_uniprot_references(new_uniprot_ids, uniprot_cache, uniprot_fasta_index):
+            reference_sequences[reference["uniprot"]] = reference["sequence"]
+            # Save the current whole reference object for later
+            references[reference["uniprot"]] = reference
         # If we have every protein chain matched with a reference already then we stop here
         if match_sequences():
             return format_topology_data(structure, protein_sequences)
@@ -1042,7 +1908,7 @@ def format_topology_data(structure: "Structure", mapping_data: list) -> dict:
 
 
 # Align a reference aminoacid sequence with each chain sequence in a topology
-# NEVER FORGET: This system relies on the fact that topology chains are not repeated
+# Every chain is aligned, even if its sequence is repeated in other chains
 def map_sequence(ref_sequence: str, structure: "Structure") -> list:
     sequences = get_chain_sequences(structure)
     mapping: list = []
@@ -1090,27 +1956,26 @@ def align(ref_sequence: str, new_sequence: str) -> Optional[tuple[list, float]]:
     if all([letter == "X" for letter in new_sequence]):
         return None
 
-    # Return the new sequence as best aligned as possible with the reference sequence
-    alignments = pairwise2.align.localds(  # type: ignore
-        ref_sequence, new_sequence, blosum62, -10, -0.5
-    )
-    # DANI: Habría que hacerlo de esta otra forma según el deprecation warning (arriba hay más código)
-    # DANI: El problema es que el output lo tiene todo menos la sequencia en formato alienada
-    # DANI: i.e. formato '----VNLTT', que es justo el que necesito
-    # alignments = aligner.align(ref_sequence, new_sequence)
+    # Try first to find the new sequence as it is in the reference sequence, which is much faster than aligning
+    exact_match = find_exact_match(ref_sequence, new_sequence)
+    if exact_match:
+        return exact_match
+
+    # Align the new sequence with the reference sequence
+    # Only the best local alignment is computed, with affine gap penalties
+    # Letters which are not in the substitution matrix (e.g. 'U' in selenoproteins) are aligned as 'X'
+    alignments = get_aligner().align(get_alignable_sequence(ref_sequence), get_alignable_sequence(new_sequence))
 
     # In case there are no alignments it means the current chain has nothing to do with this reference
     # Then an array filled with None is returned
-    if len(alignments) == 0:
+    if alignments.score <= 0:
         return None
 
-    # Several alignments may be returned, specially when it is a difficult or impossible alignment
-    # Output format example: '----VNLTT'
+    # Several alignments may be possible, specially when it is a difficult or impossible alignment
     best_alignment = alignments[0]
-    aligned_sequence = best_alignment[1]
-    print(format_alignment(*alignments[0]))
-    score = alignments[0][2]
-    # WARNING: Do not use 'aligned_sequence' length here since it has the total sequence length
+    print(best_alignment)
+    score = best_alignment.score
+    print("  Score=" + str(score) + "\n")
     normalized_score = score / len(new_sequence)
     print("Normalized score: " + str(normalized_score))
 
@@ -1123,64 +1988,318 @@ def align(ref_sequence: str, new_sequence: str) -> Optional[tuple[list, float]]:
         print("Not valid alignment")
         return None
 
-    # Match each residue
-    aligned_mapping: list = []
-    aligned_index = 0
-    for l_index, letter in enumerate(aligned_sequence):
-        # Guions are skipped
-        if letter == "-":
+    # Match each residue from the alignment coordinates
+    # Coordinates are the reference and new sequence positions where each aligned block starts and ends
+    # WARNING: Add +1 since uniprot residue counts start at 1, not 0
+    (reference_positions, new_positions) = best_alignment.coordinates.tolist()
+    aligned_mapping: list = [None] * len(new_sequence)
+    for reference_start, reference_end, new_start, new_end in zip(
+        reference_positions, reference_positions[1:], new_positions, new_positions[1:]
+    ):
+        # Residues inserted in the new sequence, with no equivalent in the reference, keep None
+        if reference_start == reference_end:
             continue
-        # Get the current residue of the new sequence
-        equivalent_letter = new_sequence[aligned_index]
-        if not letter == equivalent_letter:
-            raise SystemExit("Something was wrong:S")
-        # 'X' residues cannot be mapped since reference sequences should never have any 'X'
+        if new_start != new_end:
+            aligned_mapping[new_start:new_end] = range(reference_start + 1, reference_end + 1)
+    # Residues out of the aligned region are numbered consecutively to the aligned region edges
+    # Residues which would be numbered below 1 keep None
+    first_reference, first_new = reference_positions[0], new_positions[0]
+    for new_index in range(first_new):
+        reference_number = first_reference - (first_new - new_index) + 1
+        aligned_mapping[new_index] = reference_number if reference_number >= 1 else None
+    last_reference, last_new = reference_positions[-1], new_positions[-1]
+    for new_index in range(last_new, len(new_sequence)):
+        aligned_mapping[new_index] = last_reference + (new_index - last_new) + 1
+    # 'X' residues cannot be mapped since reference sequences should never have any 'X'
+    for new_index, letter in enumerate(new_sequence):
         if letter == "X":
-            aligned_mapping.append(None)
-            aligned_index += 1
-            continue
-        # Otherwise add the equivalent aligned index to the mapping
-        # WARNING: Add +1 since uniprot residue counts start at 1, not 0
-        aligned_mapping.append(l_index + 1)
-        aligned_index += 1
+            aligned_mapping[new_index] = None
 
     return aligned_mapping, normalized_score
 
 
-# Given an aminoacids sequence, return a list of uniprot ids
+# Find a new sequence as a contiguous segment of a reference sequence
+# Terminal 'X' residues are not required to be inside the reference sequence
+# Return the mapping and the normalized score as in the 'align' function, or None if the sequence is not found
+# The score is the score of the ungapped alignment of the segment, which is what the local alignment finds
+# This is only true for segments of identical residues, so sequences with inner 'X' residues or letters which are not
+# in the substitution matrix are left to the local alignment
+def find_exact_match(ref_sequence: str, new_sequence: str) -> Optional[tuple[list, float]]:
+    core_sequence = new_sequence.strip("X")
+    core_offset = len(new_sequence) - len(new_sequence.lstrip("X"))
+    if not core_sequence or get_alignable_sequence(core_sequence) != core_sequence or "X" in core_sequence:
+        return None
+    core_start = ref_sequence.find(core_sequence)
+    if core_start == -1:
+        return None
+    substitution_matrix = get_aligner().substitution_matrix
+    score = float(sum(substitution_matrix[letter][letter] for letter in core_sequence))
+    normalized_score = score / len(new_sequence)
+    print("Exact match at reference residue " + str(core_start + 1) + "\n  Score=" + str(score) + "\n")
+    print("Normalized score: " + str(normalized_score))
+    if normalized_score < 1:
+        print("Not valid alignment")
+        return None
+    # WARNING: Add +1 since uniprot residue counts start at 1, not 0
+    first_number = core_start - core_offset + 1
+    aligned_mapping = [
+        None if letter == "X" or first_number + index < 1 else first_number + index
+        for index, letter in enumerate(new_sequence)
+    ]
+    return aligned_mapping, normalized_score
+
+
+# Align several pairs of sequences, each new sequence with its reference sequence
+# If a memo is passed then memoized alignments are not aligned again and new alignments are memoized
+# If several workers are set then pairs are aligned in parallel by a pool of processes
+# Results and alignment logs are returned in the same order as pairs, no matter which one finishes first
+def align_pairs(
+    ref_sequences: list[str], new_sequences: list[str], num_workers: int = 1, memo: Optional[AlignmentMemo] = None
+) -> list:
+    if memo:
+        results, found = memo.get_results(ref_sequences, new_sequences)
+        missing_indices = [index for index, is_found in enumerate(found) if not is_found]
+        if len(missing_indices) < len(found):
+            print("Skipped " + str(len(found) - len(missing_indices)) + " memoized alignments")
+        missing_ref_sequences = [ref_sequences[index] for index in missing_indices]
+        missing_new_sequences = [new_sequences[index] for index in missing_indices]
+        missing_results = align_pairs(missing_ref_sequences, missing_new_sequences, num_workers)
+        memo.set_results(missing_ref_sequences, missing_new_sequences, missing_results)
+        for index, result in zip(missing_indices, missing_results):
+            results[index] = result
+        return results
+    if num_workers <= 1 or len(ref_sequences) <= 1:
+        return [align(ref_sequence, new_sequence) for ref_sequence, new_sequence in zip(ref_sequences, new_sequences)]
+    with ProcessPoolExecutor(max_workers=min(num_workers, len(ref_sequences))) as executor:
+        logged_results = list(executor.map(_align_logged, ref_sequences, new_sequences))
+    results = []
+    for log, result in logged_results:
+        print(log, end="")
+        results.append(result)
+    return results
+
+
+# Align two aminoacid sequences and return the alignment log along with the results
+def _align_logged(ref_sequence: str, new_sequence: str) -> tuple[str, Optional[tuple[list, float]]]:
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        result = align(ref_sequence, new_sequence)
+    return log.getvalue(), result
+
+
+# Given an aminoacids sequence, return the best uniprot id (None if there is no hit)
 # Note that we are blasting against UniProtKB / Swiss-Prot so results will always be valid UniProt accessions
 # WARNING: This always means results will correspond to curated entries only
 #   If your sequence is from an exotic organism the result may be not from it but from other more studied organism
-def blast(sequence: str) -> list[str]:
-    print("Throwing blast... (this may take a few minutes)")
-    result = NCBIWWW.qblast(program="blastp", database="swissprot", sequence=sequence)
+# If a local FASTA index is passed then it is searched instead, with no request
+def blast(sequence: str, fasta_index: Optional[UniprotFastaIndex] = None) -> Optional[str]:
+    return blast_sequences([sequence], fasta_index)[0]
+
+
+# Given several aminoacids sequences, return the best uniprot id for each sequence (None if there is no hit)
+# All sequences are submitted together as a single multi-query blast, so they all wait for the same job
+def blast_sequences(sequences: list[str], fasta_index: Optional[UniprotFastaIndex] = None) -> list[Optional[str]]:
+    if len(sequences) == 0:
+        return []
+    if fasta_index:
+        print("Searching the local FASTA file...")
+        return [fasta_index.search(sequence) for sequence in sequences]
+    print("Throwing blast with " + str(len(sequences)) + " sequences... (this may take a few minutes)")
+    # Query names are not numeric, so they can not be taken as GI numbers
+    query = "".join(">query_" + str(index) + "\n" + sequence + "\n" for index, sequence in enumerate(sequences))
+    result = NCBIWWW.qblast(program="blastp", database="swissprot", sequence=query)
     parsed_result = xmltodict.parse(result.read())
-    hits = parsed_result["BlastOutput"]["BlastOutput_iterations"]["Iteration"][
-        "Iteration_hits"
-    ]["Hit"]
-    # Get the first result only
-    result = hits[0]
-    # Return the accession
-    # DANI: Si algun día tienes problemas porque te falta el '.1' al final del accession puedes sacarlo de Hit_id
-    accession = result["Hit_accession"]
-    print("Result: " + accession)
-    print(result["Hit_def"])
-    return accession
+    # Note that xmltodict returns single elements as they are and several elements as a list
+    iterations = parsed_result["BlastOutput"]["BlastOutput_iterations"]["Iteration"]
+    if not isinstance(iterations, list):
+        iterations = [iterations]
+    accessions: list[Optional[str]] = [None] * len(sequences)
+    for position, iteration in enumerate(iterations):
+        # Results are matched back to their sequences by the iteration number, which starts at 1 in the order of queries
+        # Query names are not relied on, since they may be rewritten
+        # If the iteration number is missing or out of range then the order of iterations is used instead
+        iteration_number = str(iteration.get("Iteration_iter-num") or "")
+        index = int(iteration_number) - 1 if iteration_number.isdigit() else position
+        if not 0 <= index < len(sequences):
+            index = position
+        hits = (iteration.get("Iteration_hits") or {}).get("Hit")
+        if not hits:
+            print("Query " + str(index) + ": No result")
+            continue
+        # Get the first result only
+        hit = hits[0] if isinstance(hits, list) else hits
+        # Return the accession
+        # DANI: Si algun día tienes problemas porque te falta el '.1' al final del accession puedes sacarlo de Hit_id
+        accession = hit["Hit_accession"]
+        print("Query " + str(index) + " result: " + accession)
+        print(hit["Hit_def"])
+        accessions[index] = accession
+    return accessions
 
 
 # Given a uniprot accession, use the uniprot API to request its data and then mine what is needed for the database
-def get_uniprot_reference(uniprot_accession: str) -> dict:
-    # Request Uniprot
-    request_url = "https://www.ebi.ac.uk/proteins/api/proteins/" + uniprot_accession
-    try:
-        with urllib.request.urlopen(request_url) as response:
-            parsed_response = json.loads(response.read().decode("utf-8"))
-    # If the accession is not found in UniProt then the id is not valid
-    except urllib.error.HTTPError as error:  # type: ignore
-        if error.code == 400:
+# Requests reuse the passed keep-alive connections, if any, or otherwise a connection which is closed at the end
+def get_uniprot_reference(
+    uniprot_accession: str,
+    cache: Optional[UniprotCache] = None,
+    fasta_index: Optional[UniprotFastaIndex] = None,
+    connections: Optional["KeepAliveConnections"] = None,
+) -> dict:
+    # Get the reference from the local FASTA file, if any, with no request
+    if fasta_index:
+        sequence = fasta_index.get_sequence(uniprot_accession)
+        if not sequence:
             raise ValueError(
-                "Something went wrong with the Uniprot request: " + request_url
+                "UniProt accession " + uniprot_accession + " is not in the local FASTA file " + fasta_index.fasta_path
             )
+        return {"uniprot": uniprot_accession, "sequence": sequence}
+    # Use the cached reference, if any
+    if cache:
+        sequence = cache.get_sequence(uniprot_accession)
+        if sequence:
+            return {"uniprot": uniprot_accession, "sequence": sequence}
+    # Request Uniprot
+    request_url = UNIPROT_API_URL + uniprot_accession
+    if connections:
+        status, body = connections.request(request_url, UNIPROT_REQUEST_TIMEOUT)
+    else:
+        with contextlib.closing(KeepAliveConnections()) as own_connections:
+            status, body = own_connections.request(request_url, UNIPROT_REQUEST_TIMEOUT)
+    # If the accession is not found in UniProt then the id is not valid
+    if status != 200:
+        raise ValueError(
+            "Something went wrong with the Uniprot request (" + str(status) + "): " + request_url
+        )
+    parsed_response = json.loads(body.decode("utf-8"))
     # Get the aminoacids sequence
     sequence = parsed_response["sequence"]["sequence"]
+    if cache:
+        cache.set_sequence(uniprot_accession, sequence)
     return {"uniprot": uniprot_accession, "sequence": sequence}
+
+
+# Given several uniprot accessions, get all their references concurrently
+# Requests are run by a bounded number of threads, each one reusing its own keep-alive connection
+# All connections are closed once every reference is got
+# References are returned in the same order as accessions
+# If any reference fails then its error is raised, unless errors are returned, in which case they replace their references
+def get_uniprot_references(
+    uniprot_accessions: list[str],
+    cache: Optional[UniprotCache] = None,
+    fasta_index: Optional[UniprotFastaIndex] = None,
+    max_concurrency: int = UNIPROT_MAX_CONCURRENCY,
+    return_errors: bool = False,
+) -> list:
+    def get_reference(accession: str, connections: Optional[KeepAliveConnections]) -> Union[dict, Exception]:
+        try:
+            return get_uniprot_reference(accession, cache, fasta_index, connections)
+        except Exception as error:
+            if not return_errors:
+                raise
+            return error
+
+    # References in a local FASTA file are read with no request, so they are not worth threads
+    if fasta_index:
+        return [get_reference(accession, None) for accession in uniprot_accessions]
+    with contextlib.closing(KeepAliveConnections()) as connections:
+        if len(uniprot_accessions) <= 1 or max_concurrency <= 1:
+            return [get_reference(accession, connections) for accession in uniprot_accessions]
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(uniprot_accessions))) as executor:
+            return list(executor.map(lambda accession: get_reference(accession, connections), uniprot_accessions))
+
+
+# HTTP statuses which redirect the request to the URL in the 'Location' header
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Maximum number of redirects followed by a request, as urllib does
+MAX_REDIRECTS = 10
+
+
+class KeepAliveConnections:
+    """
+    Keep-alive HTTP(S) connections, which are kept open and reused by further requests to the same host.
+    Every thread has its own connections, so requests can be sent from several threads at the same time.
+    Proxies are set by the HTTP(S)_PROXY and NO_PROXY environment variables and redirects are followed, as urllib does.
+    Connections are kept until they are closed with close().
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        # Connections of all threads, so they can be closed at the end
+        self._open_connections: set[http.client.HTTPConnection] = set()
+        self._lock = threading.Lock()
+
+    # Create a connection to a host, through a proxy if the environment sets one for it
+    # Return the connection and the headers of every request, which are sent with the absolute URL if they are not empty
+    # HTTPS requests are tunneled through the proxy, while HTTP requests are sent to the proxy with the absolute URL
+    def _create_connection(self, scheme: str, netloc: str, timeout: float) -> tuple[http.client.HTTPConnection, dict]:
+        hostname = urllib.parse.urlsplit(scheme + "://" + netloc).hostname or ""
+        proxy = urllib.request.getproxies().get(scheme)
+        connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        if not proxy or urllib.request.proxy_bypass(hostname):
+            return connection_class(netloc, timeout=timeout), {}
+        parsed_proxy = urllib.parse.urlsplit(proxy if "://" in proxy else "http://" + proxy)
+        proxy_headers = {}
+        if parsed_proxy.username:
+            credentials = urllib.parse.unquote(parsed_proxy.username) + ":" + urllib.parse.unquote(parsed_proxy.password or "")
+            proxy_headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode()
+        connection = connection_class(parsed_proxy.hostname, parsed_proxy.port, timeout=timeout)
+        if scheme == "https":
+            connection.set_tunnel(netloc, headers=proxy_headers)
+            return connection, {}
+        return connection, {"Host": netloc, **proxy_headers}
+
+    # Get the connection of the current thread to a host, creating it if there is none yet
+    # Return the connection, its proxy headers and whether it is reused
+    def _get_connection(self, scheme: str, netloc: str, timeout: float) -> tuple[http.client.HTTPConnection, dict, bool]:
+        connections = getattr(self._local, "by_host", None)
+        if connections is None:
+            connections = self._local.by_host = {}
+        if (scheme, netloc) in connections:
+            return (*connections[(scheme, netloc)], True)
+        connection, proxy_headers = connections[(scheme, netloc)] = self._create_connection(scheme, netloc, timeout)
+        with self._lock:
+            self._open_connections.add(connection)
+        return connection, proxy_headers, False
+
+    # Close the connection of the current thread to a host
+    def _close_connection(self, scheme: str, netloc: str):
+        connection, _ = self._local.by_host.pop((scheme, netloc))
+        connection.close()
+        with self._lock:
+            self._open_connections.discard(connection)
+
+    # Send a GET request and return the response status and body, following redirects
+    # If a kept connection was closed by the server in the meantime then the request is sent again once
+    # Error responses are returned as well, with their status
+    def request(self, url: str, timeout: float) -> tuple[int, bytes]:
+        for _ in range(MAX_REDIRECTS + 1):
+            parsed_url = urllib.parse.urlsplit(url)
+            scheme, netloc = parsed_url.scheme, parsed_url.netloc
+            for attempt in range(2):
+                connection, proxy_headers, reused = self._get_connection(scheme, netloc, timeout)
+                # Requests sent to a proxy, which have proxy headers, target the absolute URL
+                path = url if proxy_headers else parsed_url.path + ("?" + parsed_url.query if parsed_url.query else "")
+                try:
+                    connection.request("GET", path, headers={"Accept": "application/json", **proxy_headers})
+                    response = connection.getresponse()
+                    body = response.read()
+                except (http.client.HTTPException, OSError):
+                    self._close_connection(scheme, netloc)
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                if response.will_close:
+                    self._close_connection(scheme, netloc)
+                break
+            location = response.getheader("Location")
+            if response.status not in REDIRECT_STATUSES or not location:
+                return response.status, body
+            url = urllib.parse.urljoin(url, location)
+        raise ValueError("Too many redirects: " + url)
+
+    # Close the connections of all threads
+    def close(self):
+        with self._lock:
+            for connection in self._open_connections:
+                connection.close()
+            self._open_connections.clear()
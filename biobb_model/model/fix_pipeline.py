@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+"""Module containing the FixPipeline class and the command line interface."""
+
+import os
+from typing import Optional
+
+from biobb_common.generic.biobb_object import BiobbObject
+from biobb_common.tools import file_utils as fu
+from biobb_common.tools.file_utils import launchlogger
+
+from biobb_model.model.batch import get_batch_main
+from biobb_model.model.common import _from_string_to_list, modeller_installed, run_check_structure_block
+from biobb_model.model.result_cache import get_result_key, restore_result, save_result
+
+# Fixes which can be applied by the pipeline, in their usual order
+FIXES = ["altlocs", "amides", "chirality", "ssbonds", "side_chain", "backbone"]
+
+
+class FixPipeline(BiobbObject):
+    """
+    | biobb_model FixPipeline
+    | Class to apply several fixes to a PDB structure in a single session.
+    | Apply an ordered list of fixes (alternate locations, amides, chirality, SS bonds, side chains and backbone) to a PDB structure using `biobb_structure_checking <https://anaconda.org/bioconda/biobb_structure_checking>`_. The structure is loaded once and only the final result is written.
+
+    Args:
+        input_pdb_path (str): Input PDB file path. File type: input. `Sample file <https://github.com/bioexcel/biobb_model/raw/master/biobb_model/test/data/model/1aki.pdb>`_. Accepted formats: pdb (edam:format_1476).
+        output_pdb_path (str): Output PDB file path. File type: output. `Sample file <https://github.com/bioexcel/biobb_model/raw/master/biobb_model/test/reference/model/output_pipeline.pdb>`_. Accepted formats: pdb (edam:format_1476).
+        input_fasta_canonical_sequence_path (str) (Optional): Input FASTA file path, required by the backbone fix. File type: input. `Sample file <https://github.com/bioexcel/biobb_model/raw/master/biobb_model/test/data/model/2ki5.fasta>`_. Accepted formats: fasta (edam:format_1929).
+        properties (dict - Python dictionary object containing the tool parameters, not input/output files):
+            * **fixes** (*list*) - (["altlocs", "amides", "chirality", "ssbonds", "side_chain"]) Ordered list of fixes to apply. Values: altlocs (Fix alternate locations), amides (Fix amide groups), chirality (Fix chirality of residues), ssbonds (Mark SS bonds), side_chain (Model the missing side chain atoms), backbone (Model the missing backbone atoms).
+            * **altlocs** (*list*) - (None) List of alternate locations to fix. Format: ["A339:A", "A171:B", "A768:A"]; where for each residue the format is as follows: "<chain><residue id>:<chosen alternate location>". If empty, the alternate locations with the highest occupancy are selected.
+            * **use_modeller** (*bool*) - (False) Use `Modeller suite <https://salilab.org/modeller/>`_ to rebuild the missing side chain atoms.
+            * **add_caps** (*bool*) - (False) Add caps to terminal residues when fixing the backbone.
+            * **modeller_key** (*str*) - (None) Modeller license key.
+            * **binary_path** (*str*) - ("check_structure") Path to the check_structure executable binary.
+            * **in_process** (*bool*) - (False) Run check_structure in the current process through the biobb_structure_checking library instead of launching the binary. Ignored when running in a container or when env_vars_dict, timeout or dev are set.
+            * **result_cache_path** (*str*) - (None) Path to the result cache directory. If the inputs, the relevant properties and the tool versions match a cached result, it is copied to the outputs without running the block. If not set, the BIOBB_RESULT_CACHE environment variable is used, if any.
+            * **remove_tmp** (*bool*) - (True) [WF property] Remove temporal files.
+            * **restart** (*bool*) - (False) [WF property] Do not execute if output files exist.
+            * **sandbox_path** (*str*) - ("./") [WF property] Parent path to the sandbox directory.
+
+    Examples:
+        This is a use example of how to use the building block from Python::
+
+            from biobb_model.model.fix_pipeline import fix_pipeline
+            prop = { 'fixes': ['altlocs', 'amides', 'chirality', 'side_chain'] }
+            fix_pipeline(input_pdb_path='/path/to/myStructure.pdb',
+                         output_pdb_path='/path/to/newStructure.pdb',
+                         properties=prop)
+
+    Info:
+        * wrapped_software:
+            * name: In house
+            * license: Apache-2.0
+        * ontology:
+            * name: EDAM
+            * schema: http://edamontology.org/EDAM.owl
+    """
+
+    def __init__(
+        self,
+        input_pdb_path: str,
+        output_pdb_path: str,
+        input_fasta_canonical_sequence_path: Optional[str] = None,
+        properties: Optional[dict] = None,
+        **kwargs,
+    ) -> None:
+        properties = properties or {}
+
+        # Call parent class constructor
+        super().__init__(properties)
+        self.locals_var_dict = locals().copy()
+
+        # Input/Output files
+        self.io_dict = {
+            "in": {
+                "input_pdb_path": input_pdb_path,
+                "input_fasta_canonical_sequence_path": input_fasta_canonical_sequence_path,
+            },
+            "out": {"output_pdb_path": output_pdb_path},
+        }
+
+        # Properties specific for BB
+        self.binary_path = properties.get("binary_path", "check_structure")
+        self.in_process = properties.get("in_process", False)
+        self.fixes = _from_string_to_list(properties.get("fixes", FIXES[:-1]))
+        self.altlocs = _from_string_to_list(properties.get("altlocs", None))
+        self.use_modeller = properties.get("use_modeller", False)
+        self.add_caps = properties.get("add_caps", False)
+        self.modeller_key = properties.get("modeller_key")
+        self.result_cache_path = properties.get("result_cache_path")
+
+        # Check the properties
+        self.check_properties(properties)
+        self.check_arguments()
+
+        for fix in self.fixes:
+            if fix not in FIXES:
+                raise ValueError(f"Fix '{fix}' is not supported. Supported fixes are: {', '.join(FIXES)}")
+        if "backbone" in self.fixes and not input_fasta_canonical_sequence_path:
+            raise ValueError("The backbone fix requires the input_fasta_canonical_sequence_path file")
+
+    # Get the check_structure command of every fix, in the same order
+    def get_commands(self) -> list[str]:
+        commands = []
+        for fix in self.fixes:
+            if fix == "altlocs":
+                commands.append("altloc --select " + (",".join(self.altlocs) if self.altlocs else "occupancy"))
+            elif fix == "amides":
+                commands.append("amide --fix All")
+            elif fix == "chirality":
+                commands.append("chiral --fix All")
+            elif fix == "ssbonds":
+                commands.append("getss --mark All")
+            elif fix == "side_chain":
+                command = "fixside --fix ALL"
+                if self.use_modeller:
+                    if modeller_installed(self.out_log, self.global_log):
+                        command += " --rebuild"
+                    else:
+                        fu.log(
+                            "Modeller is not installed --rebuild option can not be used proceeding without using it",
+                            self.out_log,
+                            self.global_log,
+                        )
+                commands.append(command)
+            elif fix == "backbone":
+                commands.append("backbone --fix_atoms All --fix_chain All --add_caps " + ("All" if self.add_caps else "None"))
+        return commands
+
+    @launchlogger
+    def launch(self) -> int:
+        """Execute the :class:`FixPipeline <model.fix_pipeline.FixPipeline>` object."""
+
+        # Setup Biobb
+        if self.check_restart():
+            return 0
+        # Restore the result from the cache, if any
+        result_key = get_result_key(self, ["fixes", "altlocs", "use_modeller", "add_caps"])
+        if restore_result(self, result_key):
+            return 0
+        self.stage_files()
+
+        # The commands are written to a file to avoid quoting them in the command line
+        # The file is in the sandbox, so its path is mapped as the staged files are
+        commands_file_name = "fix_pipeline_commands.lst"
+        commands_file_path = os.path.join(self.stage_io_dict["unique_dir"], commands_file_name)
+        with open(commands_file_path, "w") as commands_file:
+            commands_file.write("\n".join(self.get_commands()) + "\n")
+        if self.container_path:
+            staged_commands_file_path = os.path.join(self.container_volume_path, commands_file_name)
+        elif self.chdir_sandbox:
+            staged_commands_file_path = commands_file_name
+        else:
+            staged_commands_file_path = commands_file_path
+        fu.log("Fixes to apply: " + ", ".join(self.fixes), self.out_log, self.global_log)
+
+        # Create command line
+        self.cmd = [
+            self.binary_path,
+            "-i",
+            self.stage_io_dict["in"]["input_pdb_path"],
+            "-o",
+            self.stage_io_dict["out"]["output_pdb_path"],
+            "--force_save",
+            "--non_interactive",
+        ]
+
+        if self.io_dict["in"]["input_fasta_canonical_sequence_path"]:
+            self.cmd.append("--sequence")
+            self.cmd.append(self.stage_io_dict["in"]["input_fasta_canonical_sequence_path"])
+
+        self.cmd.append("command_list")
+        self.cmd.append("--list")
+        self.cmd.append(staged_commands_file_path)
+
+        if self.modeller_key:
+            self.cmd.insert(1, self.modeller_key)
+            self.cmd.insert(1, "--modeller_key")
+
+        # Run Biobb block
+        run_check_structure_block(self, self.in_process)
+
+        # Copy files to host
+        self.copy_to_host()
+
+        # Save the result in the cache
+        save_result(self, result_key)
+
+        # Remove temporal files
+        self.tmp_files.append(commands_file_path)
+        self.remove_tmp_files()
+
+        self.check_arguments(output_files_created=True, raise_exception=False)
+        return self.return_code
+
+
+def fix_pipeline(
+    input_pdb_path: str,
+    output_pdb_path: str,
+    input_fasta_canonical_sequence_path: Optional[str] = None,
+    properties: Optional[dict] = None,
+    **kwargs,
+) -> int:
+    """Create :class:`FixPipeline <model.fix_pipeline.FixPipeline>` class and
+    execute the :meth:`launch() <model.fix_pipeline.FixPipeline.launch>` method."""
+    return FixPipeline(**dict(locals())).launch()
+
+
+fix_pipeline.__doc__ = FixPipeline.__doc__
+main = get_batch_main(FixPipeline, fix_pipeline, "Apply several fixes to a PDB structure in a single session.")
+
+if __name__ == "__main__":
+    main()
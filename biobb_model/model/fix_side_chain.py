@@ -8,7 +8,9 @@ from biobb_common.generic.biobb_object import BiobbObject
 from biobb_common.tools import file_utils as fu
 from biobb_common.tools.file_utils import launchlogger
 
-from biobb_model.model.common import modeller_installed
+from biobb_model.model.batch import get_batch_main
+from biobb_model.model.common import modeller_installed, run_check_structure_block
+from biobb_model.model.result_cache import get_result_key, restore_result, save_result
 
 
 class FixSideChain(BiobbObject):
@@ -24,6 +26,8 @@ class FixSideChain(BiobbObject):
             * **use_modeller** (*bool*) - (False) Use `Modeller suite <https://salilab.org/modeller/>`_ to rebuild the missing side chain atoms.
             * **modeller_key** (*str*) - (None) Modeller license key.
             * **binary_path** (*str*) - ("check_structure") Path to the check_structure executable binary.
+            * **in_process** (*bool*) - (False) Run check_structure in the current process through the biobb_structure_checking library instead of launching the binary. Ignored when running in a container or when env_vars_dict, timeout or dev are set.
+            * **result_cache_path** (*str*) - (None) Path to the result cache directory. If the inputs, the relevant properties and the tool versions match a cached result, it is copied to the outputs without running the block. If not set, the BIOBB_RESULT_CACHE environment variable is used, if any.
             * **remove_tmp** (*bool*) - (True) [WF property] Remove temporal files.
             * **restart** (*bool*) - (False) [WF property] Do not execute if output files exist.
             * **sandbox_path** (*str*) - ("./") [WF property] Parent path to the sandbox directory.
@@ -67,8 +71,10 @@ class FixSideChain(BiobbObject):
 
         # Properties specific for BB
         self.binary_path = properties.get("binary_path", "check_structure")
+        self.in_process = properties.get("in_process", False)
         self.use_modeller = properties.get("use_modeller", False)
         self.modeller_key = properties.get("modeller_key")
+        self.result_cache_path = properties.get("result_cache_path")
 
         # Check the properties
         self.check_properties(properties)
@@ -81,6 +87,10 @@ class FixSideChain(BiobbObject):
         # Setup Biobb
         if self.check_restart():
             return 0
+        # Restore the result from the cache, if any
+        result_key = get_result_key(self, ["use_modeller"])
+        if restore_result(self, result_key):
+            return 0
         self.stage_files()
 
         # Create command line
@@ -111,11 +121,14 @@ class FixSideChain(BiobbObject):
                 )
 
         # Run Biobb block
-        self.run_biobb()
+        run_check_structure_block(self, self.in_process)
 
         # Copy files to host
         self.copy_to_host()
 
+        # Save the result in the cache
+        save_result(self, result_key)
+
         # Remove temporal files
         self.remove_tmp_files()
 
@@ -135,7 +148,7 @@ def fix_side_chain(
 
 
 fix_side_chain.__doc__ = FixSideChain.__doc__
-main = FixSideChain.get_main(fix_side_chain, "Model the missing atoms in amino acid side chains of a PDB.")
+main = get_batch_main(FixSideChain, fix_side_chain, "Model the missing atoms in amino acid side chains of a PDB.")
 
 if __name__ == "__main__":
     main()
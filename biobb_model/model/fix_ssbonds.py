@@ -7,6 +7,10 @@ from typing import Optional
 from biobb_common.generic.biobb_object import BiobbObject
 from biobb_common.tools.file_utils import launchlogger
 
+from biobb_model.model.batch import get_batch_main
+from biobb_model.model.common import run_check_structure_block
+from biobb_model.model.result_cache import get_result_key, restore_result, save_result
+
 
 class FixSSBonds(BiobbObject):
     """
@@ -20,6 +24,8 @@ class FixSSBonds(BiobbObject):
         properties (dict - Python dictionary object containing the tool parameters, not input/output files):
             * **modeller_key** (*str*) - (None) Modeller license key.
             * **binary_path** (*str*) - ("check_structure") Path to the check_structure executable binary.
+            * **in_process** (*bool*) - (False) Run check_structure in the current process through the biobb_structure_checking library instead of launching the binary. Ignored when running in a container or when env_vars_dict, timeout or dev are set.
+            * **result_cache_path** (*str*) - (None) Path to the result cache directory. If the inputs, the relevant properties and the tool versions match a cached result, it is copied to the outputs without running the block. If not set, the BIOBB_RESULT_CACHE environment variable is used, if any.
             * **remove_tmp** (*bool*) - (True) [WF property] Remove temporal files.
             * **restart** (*bool*) - (False) [WF property] Do not execute if output files exist.
             * **sandbox_path** (*str*) - ("./") [WF property] Parent path to the sandbox directory.
@@ -63,7 +69,9 @@ class FixSSBonds(BiobbObject):
 
         # Properties specific for BB
         self.binary_path = properties.get("binary_path", "check_structure")
+        self.in_process = properties.get("in_process", False)
         self.modeller_key = properties.get("modeller_key")
+        self.result_cache_path = properties.get("result_cache_path")
 
         # Check the properties
         self.check_properties(properties)
@@ -76,6 +84,10 @@ class FixSSBonds(BiobbObject):
         # Setup Biobb
         if self.check_restart():
             return 0
+        # Restore the result from the cache, if any
+        result_key = get_result_key(self, [])
+        if restore_result(self, result_key):
+            return 0
         self.stage_files()
 
         self.cmd = [
@@ -96,11 +108,14 @@ class FixSSBonds(BiobbObject):
             self.cmd.insert(1, "--modeller_key")
 
         # Run Biobb block
-        self.run_biobb()
+        run_check_structure_block(self, self.in_process)
 
         # Copy files to host
         self.copy_to_host()
 
+        # Save the result in the cache
+        save_result(self, result_key)
+
         # Remove temporal files
         self.remove_tmp_files()
 
@@ -120,7 +135,7 @@ def fix_ssbonds(
 
 
 fix_ssbonds.__doc__ = FixSSBonds.__doc__
-main = FixSSBonds.get_main(fix_ssbonds, "Fix SS bonds from residues")
+main = get_batch_main(FixSSBonds, fix_ssbonds, "Fix SS bonds from residues")
 
 if __name__ == "__main__":
     main()
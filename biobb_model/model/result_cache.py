@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+"""Module containing the content-addressed cache of building block results."""
+
+import hashlib
+import json
+import os
+import shutil
+from importlib import metadata
+from pathlib import Path
+from typing import Optional
+
+from biobb_common.tools import file_utils as fu
+
+from biobb_model.model.common import modeller_installed
+
+# Environment variable to set the cache path when it is not explicitly passed
+RESULT_CACHE_ENV = "BIOBB_RESULT_CACHE"
+# Packages whose versions are part of every key, since they produce the results
+TOOL_PACKAGES = ["biobb_model", "biobb_structure_checking"]
+
+
+class ResultCache:
+    """
+    Persistent cache of building block outputs, keyed by the contents of the input files, the block name, the relevant
+    properties and the tool versions. Paths are not part of the key, so a result can be reused under another path.
+    Every result is a directory with one file per output argument, which is written in a temporary directory and then
+    moved, so the same cache can be shared by concurrent processes.
+
+    Args:
+        cache_path (str): Path to the cache directory. It is created if it does not exist.
+    """
+
+    def __init__(self, cache_path: str):
+        self.cache_path = os.path.abspath(cache_path)
+        os.makedirs(self.cache_path, exist_ok=True)
+
+    # Get the directory of a result
+    def _get_result_path(self, key: str) -> str:
+        return os.path.join(self.cache_path, key[:2], key)
+
+    # Get the key of a block result
+    # Inputs are hashed by contents and outputs only by extension, as the extension sets the output format
+    def get_key(self, block_name: str, input_paths: dict, output_paths: dict, properties: dict) -> str:
+        key = {
+            "block": block_name,
+            "inputs": {argument: get_file_hash(path) for argument, path in input_paths.items() if path},
+            "outputs": {argument: Path(path).suffix.lower() for argument, path in output_paths.items() if path},
+            "properties": properties,
+            "versions": get_tool_versions(),
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+    # Copy the cached outputs of a result to the output paths
+    # Return False if the result is not cached
+    def get_outputs(self, key: str, output_paths: dict) -> bool:
+        result_path = self._get_result_path(key)
+        if not all(os.path.exists(os.path.join(result_path, argument)) for argument in output_paths):
+            return False
+        for argument, path in output_paths.items():
+            shutil.copyfile(os.path.join(result_path, argument), path)
+        return True
+
+    # Save the outputs of a result in the cache
+    # Results with missing outputs are not saved
+    # A result is never replaced once it is in place, since the same key always gives the same outputs
+    # If another process saves the same result at the same time then the first one to move its result is kept
+    def set_outputs(self, key: str, output_paths: dict):
+        if not all(os.path.exists(path) for path in output_paths.values()):
+            return
+        result_path = self._get_result_path(key)
+        if os.path.exists(result_path):
+            return
+        temporary_result_path = result_path + "." + str(os.getpid()) + ".tmp"
+        shutil.rmtree(temporary_result_path, ignore_errors=True)
+        os.makedirs(temporary_result_path)
+        for argument, path in output_paths.items():
+            shutil.copyfile(path, os.path.join(temporary_result_path, argument))
+        try:
+            os.rename(temporary_result_path, result_path)
+        except OSError:
+            shutil.rmtree(temporary_result_path, ignore_errors=True)
+
+
+# Get the SHA-256 hash of a file contents
+def get_file_hash(path: str) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+# Get the versions of the packages which produce the results
+def get_tool_versions() -> dict:
+    versions = {}
+    for package in TOOL_PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+# Get the cache in the passed path or in the path set by the environment, if any
+def get_result_cache(cache_path: Optional[str] = None) -> Optional[ResultCache]:
+    cache_path = cache_path or os.environ.get(RESULT_CACHE_ENV)
+    if not cache_path:
+        return None
+    return ResultCache(cache_path)
+
+
+# Get the key of a block result, from the block inputs and outputs and the values of the passed block properties
+# Files set by properties which affect the result (e.g. reference databases) are passed as extra inputs, hashed by contents
+# The check_structure binary which is run, if any, and whether Modeller is used are part of the key as well
+# Return None if the block has no result cache
+def get_result_key(block, property_names: list[str], extra_input_paths: Optional[dict] = None) -> Optional[str]:
+    result_cache = get_result_cache(block.result_cache_path)
+    if not result_cache:
+        return None
+    properties = {name: getattr(block, name) for name in property_names}
+    # Blocks fall back silently to work with no Modeller when it is not installed
+    if getattr(block, "use_modeller", False):
+        properties["modeller_installed"] = modeller_installed()
+    binary_path = getattr(block, "binary_path", None)
+    if binary_path:
+        properties["binary_path"] = shutil.which(binary_path) or binary_path
+    input_paths = {**block.io_dict["in"], **(extra_input_paths or {})}
+    return result_cache.get_key(type(block).__name__, input_paths, block.io_dict["out"], properties)
+
+
+# Copy the cached result of a block to its output paths
+# Return False if the block has no result cache or the result is not cached
+def restore_result(block, key: Optional[str]) -> bool:
+    result_cache = get_result_cache(block.result_cache_path)
+    if not result_cache or not key:
+        return False
+    if not result_cache.get_outputs(key, block.io_dict["out"]):
+        fu.log("Result not found in the cache: " + key, block.out_log, block.global_log)
+        return False
+    fu.log("Result restored from the cache: " + key, block.out_log, block.global_log)
+    return True
+
+
+# Save the result of a block in its result cache, only if the block succeeded
+def save_result(block, key: Optional[str]):
+    result_cache = get_result_cache(block.result_cache_path)
+    if not result_cache or not key or block.return_code:
+        return
+    # The block already succeeded, so a cache failure must not make it fail
+    try:
+        result_cache.set_outputs(key, block.io_dict["out"])
+    except OSError as error:
+        fu.log("Result not saved in the cache: " + str(error), block.out_log, block.global_log)
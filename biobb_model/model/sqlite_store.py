@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+"""Module containing the persistent key-value store shared by the UniProt reference cache and the alignment memo."""
+
+import os
+import sqlite3
+import time
+from typing import Iterable, Optional
+
+# Environment variable to enable write-ahead logging when it is not explicitly enabled or disabled
+SQLITE_WAL_ENV = "BIOBB_SQLITE_WAL"
+
+
+class SqliteStore:
+    """
+    Persistent key-value store in a SQLite database, so the same store can be shared by concurrent processes.
+    Values are strings. Entries may expire after a time to live and the least recently used ones are evicted when the
+    store is full. Named counters can be kept along the store life as well.
+    The default rollback journal is used unless write-ahead logging (WAL) is enabled. WAL lets readers work while another
+    process is writing, but it relies on shared memory, so it is unsafe on network file systems (e.g. NFS or Lustre).
+    Once a database is in WAL mode it stays in it, even for processes which do not enable it.
+
+    Args:
+        store_path (str): Path to the database file. It is created if it does not exist.
+        table (str): Name of the table with the entries. Counters are kept in the same name plus '_counters'.
+        ttl (int): (None) Time to live of the entries in seconds. If not set, entries never expire.
+        max_entries (int): (None) Maximum number of entries. If not set, entries are never evicted.
+        wal (bool): (None) Enable write-ahead logging. If not set, it is enabled when the BIOBB_SQLITE_WAL environment variable is set to 1.
+    """
+
+    def __init__(
+        self,
+        store_path: str,
+        table: str,
+        ttl: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        wal: Optional[bool] = None,
+    ):
+        self.store_path = store_path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wal = os.environ.get(SQLITE_WAL_ENV) == "1" if wal is None else wal
+        store_directory = os.path.dirname(os.path.abspath(store_path))
+        os.makedirs(store_directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS " + table + " ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                connection.execute("CREATE INDEX IF NOT EXISTS " + table + "_accessed_at ON " + table + " (accessed_at)")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS " + table + "_counters (name TEXT PRIMARY KEY, count INTEGER NOT NULL)"
+                )
+        finally:
+            connection.close()
+
+    # Open a new connection to the store database
+    # Writers wait for other processes to release their locks instead of failing
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.store_path, timeout=60)
+        if self.wal:
+            connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    # Get the values of several keys, as a dict with only the keys which are found and not expired
+    # Found entries are marked as recently used
+    def get_values(self, keys: Iterable[str]) -> dict:
+        now = time.time()
+        values = {}
+        connection = self._connect()
+        try:
+            with connection:
+                for key in set(keys):
+                    row = connection.execute(
+                        "SELECT value, created_at FROM " + self.table + " WHERE key = ?", (key,)
+                    ).fetchone()
+                    if not row or (self.ttl is not None and now - row[1] > self.ttl):
+                        continue
+                    values[key] = row[0]
+                    connection.execute("UPDATE " + self.table + " SET accessed_at = ? WHERE key = ?", (now, key))
+        finally:
+            connection.close()
+        return values
+
+    # Save the values of several keys
+    # Then remove the least recently used entries if the store is full
+    def set_values(self, values: dict):
+        now = time.time()
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO " + self.table + " (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    [(key, value, now, now) for key, value in values.items()],
+                )
+                if self.max_entries is not None:
+                    connection.execute(
+                        "DELETE FROM " + self.table + " WHERE key IN ("
+                        "SELECT key FROM " + self.table + " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,),
+                    )
+        finally:
+            connection.close()
+
+    # Remove all expired entries
+    # Return the number of removed entries
+    def purge_expired(self) -> int:
+        if self.ttl is None:
+            return 0
+        connection = self._connect()
+        try:
+            with connection:
+                cursor = connection.execute(
+                    "DELETE FROM " + self.table + " WHERE created_at < ?", (time.time() - self.ttl,)
+                )
+        finally:
+            connection.close()
+        return cursor.rowcount
+
+    # Get the number of entries, including the expired ones which are not purged yet
+    def count_entries(self) -> int:
+        connection = self._connect()
+        try:
+            return connection.execute("SELECT COUNT(*) FROM " + self.table).fetchone()[0]
+        finally:
+            connection.close()
+
+    # Add to the named counters
+    def add_counts(self, counts: dict):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO " + self.table + "_counters (name, count) VALUES (?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET count = count + excluded.count",
+                    list(counts.items()),
+                )
+        finally:
+            connection.close()
+
+    # Get the named counters
+    def get_counts(self) -> dict:
+        connection = self._connect()
+        try:
+            return dict(connection.execute("SELECT name, count FROM " + self.table + "_counters").fetchall())
+        finally:
+            connection.close()
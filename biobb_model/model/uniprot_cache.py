@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+"""Module containing the UniProt reference cache and the prefetch command line interface."""
+
+import argparse
+import os
+import sys
+from typing import Optional
+
+from biobb_model.model.sqlite_store import SqliteStore
+
+# Environment variable to set the cache path when it is not explicitly passed
+UNIPROT_CACHE_ENV = "BIOBB_UNIPROT_CACHE"
+# Cached references older than this number of seconds are fetched again
+DEFAULT_TTL = 30 * 24 * 60 * 60
+# Once the cache exceeds this number of references the least recently used references are removed
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class UniprotCache:
+    """
+    Persistent cache of UniProt reference sequences keyed by accession.
+    References are stored in a SQLite database, so the same cache can be shared by concurrent processes.
+    References expire after a time to live and the least recently used ones are evicted when the cache is full.
+
+    Args:
+        cache_path (str): Path to the cache database file. It is created if it does not exist.
+        ttl (int): (2592000) Time to live of cached references in seconds.
+        max_entries (int): (10000) Maximum number of references in the cache.
+    """
+
+    def __init__(self, cache_path: str, ttl: int = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.store = SqliteStore(cache_path, "refs", ttl=ttl, max_entries=max_entries)
+
+    # Get the cached reference sequence of an accession
+    # Return None if the accession is not cached or it has expired
+    def get_sequence(self, accession: str) -> Optional[str]:
+        return self.store.get_values([accession]).get(accession)
+
+    # Save the reference sequence of an accession in the cache
+    # Then remove the least recently used references if the cache is full
+    def set_sequence(self, accession: str, sequence: str):
+        self.store.set_values({accession: sequence})
+
+    # Remove all expired references from the cache
+    # Return the number of removed references
+    def purge_expired(self) -> int:
+        return self.store.purge_expired()
+
+
+# Get the cache in the passed path or in the path set by the environment, if any
+def get_uniprot_cache(cache_path: Optional[str] = None) -> Optional[UniprotCache]:
+    cache_path = cache_path or os.environ.get(UNIPROT_CACHE_ENV)
+    if not cache_path:
+        return None
+    return UniprotCache(cache_path)
+
+
+def main():
+    """Command line execution of the UniProt references prefetch."""
+    parser = argparse.ArgumentParser(
+        description="Fetch UniProt references in advance and save them in the UniProt reference cache.",
+        formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999),
+    )
+    parser.add_argument("accessions", nargs="*", help="UniProt accessions to be fetched.")
+    parser.add_argument(
+        "-i", "--input_accessions_path",
+        help="Text file with UniProt accessions to be fetched, separated by spaces, commas or new lines."
+    )
+    parser.add_argument(
+        "-c", "--cache_path",
+        help="Path to the cache database file. If not set, the " + UNIPROT_CACHE_ENV + " environment variable is used."
+    )
+    parser.add_argument("--ttl", type=int, default=DEFAULT_TTL, help="Time to live of cached references in seconds.")
+    parser.add_argument(
+        "--max_entries", type=int, default=DEFAULT_MAX_ENTRIES, help="Maximum number of references in the cache."
+    )
+    args = parser.parse_args()
+
+    # Imported here since the reference request module depends on this module
+    from biobb_model.model.fix_pdb_utils import get_uniprot_references
+
+    cache_path = args.cache_path or os.environ.get(UNIPROT_CACHE_ENV)
+    if not cache_path:
+        parser.error("Set the cache path with --cache_path or the " + UNIPROT_CACHE_ENV + " environment variable")
+    cache = UniprotCache(cache_path, ttl=args.ttl, max_entries=args.max_entries)
+    accessions = list(args.accessions)
+    if args.input_accessions_path:
+        with open(args.input_accessions_path, "r") as file:
+            accessions += file.read().replace(",", " ").split()
+    print("Purged " + str(cache.purge_expired()) + " expired references")
+    # Only the references which are not cached yet are fetched, all together
+    # A failing accession is reported and does not stop the rest
+    missing_accessions = []
+    for accession in dict.fromkeys(accessions):
+        if cache.get_sequence(accession):
+            print("   " + accession + " -> Already cached")
+        else:
+            missing_accessions.append(accession)
+    references = get_uniprot_references(missing_accessions, cache=cache, return_errors=True)
+    failed_accessions = []
+    for accession, reference in zip(missing_accessions, references):
+        if isinstance(reference, Exception):
+            failed_accessions.append(accession)
+            print("   " + accession + " -> Failed: " + str(reference))
+        else:
+            print("   " + accession + " -> Fetched")
+    if failed_accessions:
+        sys.exit("Failed to fetch " + str(len(failed_accessions)) + " of " + str(len(missing_accessions)) + " references")
+
+
+if __name__ == "__main__":
+    main()
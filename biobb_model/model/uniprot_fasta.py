@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+"""Module containing the offline UniProt reference resolver from a local FASTA file."""
+
+import os
+import shutil
+from typing import Optional
+
+import numpy as np
+from Bio import SeqIO  # type: ignore
+
+from biobb_model.model.alignment import get_alignable_sequence, get_aligner
+
+# Length of the k-mers in the k-mer index
+KMER_SIZE = 4
+# Aminoacids which are encoded in k-mers
+# K-mers including any other letter (e.g. 'X') are not indexed
+KMER_LETTERS = "ACDEFGHIKLMNPQRSTVWY"
+# Code of each ASCII character in k-mers, which is -1 for letters which are not indexed
+KMER_LETTER_CODES = np.full(128, -1, dtype=np.int32)
+KMER_LETTER_CODES[np.frombuffer(KMER_LETTERS.encode(), dtype=np.uint8)] = np.arange(len(KMER_LETTERS))
+# Number of candidates sharing the most k-mers with the query which are then confirmed by alignment
+SEARCH_CANDIDATES = 20
+
+
+# Get the UniProt accession from a FASTA record id
+# UniProt FASTA ids look like 'sp|P00533|EGFR_HUMAN' but plain accessions are accepted as well
+def get_fasta_accession(record_id: str) -> str:
+    fields = record_id.split("|")
+    return fields[1] if len(fields) >= 3 else record_id
+
+
+class UniprotFastaIndex:
+    """
+    Offline resolver of UniProt reference sequences from a local FASTA file (e.g. a Swiss-Prot dump).
+    The position of every record in the FASTA file is indexed by accession in a SQLite file.
+    The index is built the first time it is needed and every lookup is then a single random read.
+
+    Args:
+        fasta_path (str): Path to the UniProt FASTA file.
+        index_path (str): (None) Path to the index file. If not set, it is the FASTA path plus '.idx'.
+        kmers_path (str): (None) Path to the k-mer index directory, used to search sequences. If not set, it is the FASTA path plus '.kmers'. Every version of the FASTA file gets its own index inside.
+    """
+
+    def __init__(self, fasta_path: str, index_path: Optional[str] = None, kmers_path: Optional[str] = None):
+        if not os.path.exists(fasta_path):
+            raise SystemExit('File "' + fasta_path + '" not found')
+        self.fasta_path = os.path.abspath(fasta_path)
+        self.index_path = index_path or self.fasta_path + ".idx"
+        self.kmers_path = kmers_path or self.fasta_path + ".kmers"
+        # K-mer index arrays, which are loaded the first time a sequence is searched
+        self._kmer_offsets: Optional[np.ndarray] = None
+        self._kmer_records: Optional[np.ndarray] = None
+        self._kmer_accessions: Optional[np.ndarray] = None
+        # Build the index if it is missing or older than the FASTA file
+        if not os.path.exists(self.index_path) or os.path.getmtime(self.index_path) < os.path.getmtime(self.fasta_path):
+            self.build_index()
+        self._records = SeqIO.index_db(self.index_path, key_function=get_fasta_accession)
+
+    # Build the index in a temporary file and then move it to the index path
+    # This way concurrent processes never read a half-built index
+    def build_index(self):
+        print("Indexing " + self.fasta_path)
+        temporary_index_path = self.index_path + "." + str(os.getpid()) + ".tmp"
+        if os.path.exists(temporary_index_path):
+            os.remove(temporary_index_path)
+        records = SeqIO.index_db(temporary_index_path, self.fasta_path, "fasta", key_function=get_fasta_accession)
+        records.close()
+        os.replace(temporary_index_path, self.index_path)
+
+    # Get the reference sequence of an accession
+    # Return None if the accession is not in the FASTA file
+    def get_sequence(self, accession: str) -> Optional[str]:
+        if accession not in self._records:
+            return None
+        return str(self._records[accession].seq)
+
+    # Get the path of the k-mer index of the current FASTA file version, which is named after its modification time and size
+    def get_kmer_index_path(self) -> str:
+        fasta_stat = os.stat(self.fasta_path)
+        return os.path.join(self.kmers_path, str(fasta_stat.st_mtime_ns) + "_" + str(fasta_stat.st_size))
+
+    # Build the k-mer inverted index: for every k-mer, the records which include it
+    # It is stored as offsets and record indices in CSR format, so k-mer 'k' records are records[offsets[k]:offsets[k+1]]
+    # K-mer codes are 32 bit integers, since there are only 20^4 different k-mers
+    # Arrays are saved in a temporary directory which is then renamed as the index of the current FASTA version
+    # Renaming a directory is atomic and fails if the index exists, so an index is never modified once it is in place
+    # Then the indices of previous FASTA versions are removed
+    def build_kmer_index(self):
+        print("Indexing " + self.fasta_path + " k-mers")
+        kmer_index_path = self.get_kmer_index_path()
+        accessions = []
+        record_kmers = []
+        with open(self.fasta_path, "r") as file:
+            for record in SeqIO.parse(file, "fasta"):
+                accessions.append(get_fasta_accession(record.id))
+                record_kmers.append(np.unique(get_kmers(str(record.seq))))
+        kmer_counts = np.fromiter(map(len, record_kmers), dtype=np.int64, count=len(record_kmers))
+        kmers = np.concatenate(record_kmers) if record_kmers else np.empty(0, dtype=np.int32)
+        del record_kmers
+        record_indices = np.repeat(np.arange(len(accessions), dtype=np.int32), kmer_counts)
+        order = np.argsort(kmers, kind="stable")
+        offsets = np.zeros(len(KMER_LETTERS) ** KMER_SIZE + 1, dtype=np.int64)
+        np.cumsum(np.bincount(kmers, minlength=len(KMER_LETTERS) ** KMER_SIZE), out=offsets[1:])
+        temporary_kmers_path = kmer_index_path + "." + str(os.getpid()) + ".tmp"
+        shutil.rmtree(temporary_kmers_path, ignore_errors=True)
+        os.makedirs(temporary_kmers_path)
+        np.save(os.path.join(temporary_kmers_path, "offsets.npy"), offsets)
+        np.save(os.path.join(temporary_kmers_path, "records.npy"), record_indices[order])
+        np.save(os.path.join(temporary_kmers_path, "accessions.npy"), np.array(accessions, dtype=str))
+        try:
+            os.rename(temporary_kmers_path, kmer_index_path)
+        except OSError:
+            # Another process built the same index first
+            shutil.rmtree(temporary_kmers_path, ignore_errors=True)
+        for name in os.listdir(self.kmers_path):
+            path = os.path.join(self.kmers_path, name)
+            if path == kmer_index_path or name.endswith(".tmp"):
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+    # Load the k-mer index of the current FASTA version, building it first if it is missing
+    # Arrays are memory mapped so only the k-mers in the searched sequences are read from disk
+    def _load_kmer_index(self):
+        kmer_index_path = self.get_kmer_index_path()
+        if not os.path.exists(kmer_index_path):
+            self.build_kmer_index()
+        self._kmer_offsets = np.load(os.path.join(kmer_index_path, "offsets.npy"), mmap_mode="r")
+        self._kmer_records = np.load(os.path.join(kmer_index_path, "records.npy"), mmap_mode="r")
+        self._kmer_accessions = np.load(os.path.join(kmer_index_path, "accessions.npy"), mmap_mode="r")
+
+    # Find the reference which best matches a sequence, as a local replacement of the BLAST
+    # Candidates sharing the most k-mers with the sequence are shortlisted and then aligned with the sequence
+    # Return the accession of the best aligned candidate or None if no candidate is aligned well enough
+    def search(self, sequence: str) -> Optional[str]:
+        if self._kmer_offsets is None:
+            self._load_kmer_index()
+        assert self._kmer_offsets is not None and self._kmer_records is not None and self._kmer_accessions is not None
+        kmers = np.unique(get_kmers(sequence))
+        if len(kmers) == 0:
+            return None
+        # Count the k-mers shared with each record
+        starts = self._kmer_offsets[kmers]
+        ends = self._kmer_offsets[kmers + 1]
+        lengths = ends - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        shared_kmers = np.bincount(self._kmer_records[positions], minlength=len(self._kmer_accessions))
+        candidates = np.argsort(shared_kmers, kind="stable")[::-1][:SEARCH_CANDIDATES]
+        candidates = candidates[shared_kmers[candidates] > 0]
+        # Confirm candidates with the same local alignment scoring used to map sequences
+        # Letters missing in the substitution matrix (e.g. 'U' in selenoproteins) are aligned as 'X'
+        aligner = get_aligner()
+        alignable_sequence = get_alignable_sequence(sequence)
+        best_accession = None
+        best_score = 0.0
+        for candidate in candidates.tolist():
+            accession = str(self._kmer_accessions[candidate])
+            reference_sequence = self.get_sequence(accession)
+            if not reference_sequence:
+                continue
+            score = aligner.score(get_alignable_sequence(reference_sequence), alignable_sequence)
+            if score > best_score:
+                best_accession = accession
+                best_score = score
+        # The same minimum normalized score used to validate alignments is required here
+        if best_score / len(sequence) < 1:
+            return None
+        print("Result: " + str(best_accession))
+        return best_accession
+
+    def close(self):
+        self._records.close()
+
+
+# Get the code of every k-mer in a sequence
+# K-mers including letters which are not standard aminoacids are skipped
+def get_kmers(sequence: str) -> np.ndarray:
+    codes = KMER_LETTER_CODES[np.frombuffer(sequence.upper().encode("ascii", "replace"), dtype=np.uint8) & 127]
+    if len(codes) < KMER_SIZE:
+        return np.empty(0, dtype=np.int32)
+    windows = np.lib.stride_tricks.sliding_window_view(codes, KMER_SIZE)
+    windows = windows[(windows >= 0).all(axis=1)]
+    return windows @ (len(KMER_LETTERS) ** np.arange(KMER_SIZE - 1, -1, -1, dtype=np.int32))
@@ -0,0 +1,36 @@
+# type: ignore
+from biobb_common.tools import test_fixtures as fx
+from biobb_model.model.alignment_memo import AlignmentMemo
+
+
+class TestAlignmentMemo:
+    def setup_class(self):
+        fx.test_setup(self, 'alignment_memo')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_results(self):
+        memo = AlignmentMemo(self.paths['output_memo_path'], 'scoring')
+        ref_sequences = ['MKTAYIAK', 'MKTAYIAK', 'GGGG']
+        new_sequences = ['TAYI', 'TAYI', 'WWWW']
+        results = [([3, 4, 5, 6], 4.5), ([3, 4, 5, 6], 4.5), None]
+        assert memo.get_results(ref_sequences, new_sequences) == ([None, None, None], [False, False, False])
+        memo.set_results(ref_sequences, new_sequences, results)
+        # Not valid alignments are memoized as well, as None results
+        assert memo.get_results(ref_sequences, new_sequences) == (results, [True, True, True])
+        assert (memo.hits, memo.misses) == (3, 3)
+        # Results are shared with other memo instances, but not with other scoring parameters
+        assert AlignmentMemo(self.paths['output_memo_path'], 'scoring').get_results(['GGGG'], ['WWWW']) == ([None], [True])
+        assert AlignmentMemo(self.paths['output_memo_path'], 'other scoring').get_results(['GGGG'], ['WWWW']) == ([None], [False])
+        assert memo.get_stats() == {'hits': 4, 'misses': 4, 'entries': 2}
+
+    def test_eviction(self):
+        memo = AlignmentMemo(self.paths['output_memo_path'] + '.eviction', 'scoring', max_entries=2)
+        memo.set_results(['AAAA'], ['A'], [([1], 4.0)])
+        memo.set_results(['CCCC'], ['C'], [([1], 9.0)])
+        # Reading the first result makes the second one the least recently used
+        assert memo.get_results(['AAAA'], ['A'])[1] == [True]
+        memo.set_results(['DDDD'], ['D'], [([1], 6.0)])
+        assert memo.get_results(['AAAA', 'CCCC', 'DDDD'], ['A', 'C', 'D'])[1] == [True, False, True]
+        assert memo.get_stats()['entries'] == 2
@@ -0,0 +1,43 @@
+# type: ignore
+import os
+
+from biobb_common.tools import test_fixtures as fx
+from biobb_model.model.batch import get_batch_arguments, get_batch_input_paths, get_batch_output_paths, run_batch
+from biobb_model.model.fix_pipeline import FixPipeline
+from biobb_model.model.fix_ssbonds import FixSSBonds, fix_ssbonds
+
+
+class TestBatch:
+    def setup_class(self):
+        fx.test_setup(self, 'batch')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_run_batch(self):
+        # A missing input fails without stopping the rest of the batch
+        input_paths = [self.paths['input_pdb_path'], self.paths['input_pdb_path'], 'missing.pdb']
+        results = run_batch(FixSSBonds, fix_ssbonds, input_paths, self.paths['output_dir'], properties=self.properties, num_workers=2)
+        assert [result['return_code'] for result in results][:2] == [0, 0]
+        assert results[2]['return_code'] and results[2]['error']
+        for result in results[:2]:
+            assert fx.equal(result['paths']['output_pdb_path'], self.paths['reference_output_pdb_path'])
+
+    def test_batch_paths(self):
+        batch_argument, shared_arguments, output_arguments = get_batch_arguments(FixPipeline)
+        assert batch_argument == 'input_pdb_path'
+        assert list(shared_arguments) == ['input_fasta_canonical_sequence_path']
+        assert list(output_arguments) == ['output_pdb_path']
+        # Inputs with the same name get a numeric suffix
+        output_paths = get_batch_output_paths(['a/1aki.pdb', 'b/1aki.pdb', 'c/2ki5.txt'], 'out', output_arguments)
+        assert [paths['output_pdb_path'] for paths in output_paths] == [
+            os.path.join('out', '1aki.pdb'), os.path.join('out', '1aki_1.pdb'), os.path.join('out', '2ki5.pdb')
+        ]
+        # Manifest paths are relative to the manifest and comments are skipped
+        with open('manifest.txt', 'w') as file:
+            file.write('# Inputs\n1aki.pdb\n\nmodels/2ki5.pdb\n')
+        assert get_batch_input_paths(input_manifest='manifest.txt') == [
+            os.path.join(os.getcwd(), '1aki.pdb'), os.path.join(os.getcwd(), 'models', '2ki5.pdb')
+        ]
+        data_dir = os.path.dirname(self.paths['input_pdb_path'])
+        assert get_batch_input_paths(input_dir=data_dir, formats=['fasta']) == [os.path.join(data_dir, '2ki5.fasta')]
@@ -0,0 +1,35 @@
+# type: ignore
+import os
+
+from biobb_common.tools import test_fixtures as fx
+from biobb_model.model.common import run_check_structure
+from biobb_model.model.fix_ssbonds import fix_ssbonds
+
+
+class TestCommon:
+    def setup_class(self):
+        fx.test_setup(self, 'common')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_launch_in_process(self):
+        # The same output is written when check_structure runs in the current process
+        fix_ssbonds(properties=self.properties, **self.paths)
+        assert fx.not_empty(self.paths['output_pdb_path'])
+        assert fx.equal(self.paths['output_pdb_path'], self.paths['reference_output_pdb_path'])
+
+    def test_launch_in_process_chdir_sandbox(self):
+        # Staged files are bare names in the sandbox, which is the working directory only while check_structure runs
+        cwd = os.getcwd()
+        if os.path.exists(self.paths['output_pdb_path']):
+            os.remove(self.paths['output_pdb_path'])
+        assert fix_ssbonds(properties={**self.properties, 'chdir_sandbox': True}, **self.paths) == 0
+        assert os.getcwd() == cwd
+        assert fx.not_empty(self.paths['output_pdb_path'])
+        assert fx.equal(self.paths['output_pdb_path'], self.paths['reference_output_pdb_path'])
+
+    def test_run_check_structure_error(self):
+        # Errors of check_structure are returned as a non zero exit code instead of being raised
+        return_code = run_check_structure(['check_structure', '-i', 'missing.pdb', '-o', 'output.pdb', 'models'], None, None)
+        assert return_code != 0
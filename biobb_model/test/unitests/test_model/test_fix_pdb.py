@@ -1,6 +1,29 @@
 # type: ignore
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
 from biobb_common.tools import test_fixtures as fx
+from biobb_model.model import fix_pdb_utils
 from biobb_model.model.fix_pdb import fix_pdb
+from biobb_model.model.fix_pdb_utils import Structure, get_chain_sequences
+
+
+# Write a FASTA file whose references reproduce the numbering of the reference output
+# Every residue letter is placed at its reference number and the residues missing in the structure are filled with 'W'
+def write_reference_fasta(reference_pdb_path, accessions, fasta_path):
+    structure = Structure.from_pdb_file(reference_pdb_path)
+    with open(fasta_path, 'w') as file:
+        for chain_sequence, accession in zip(get_chain_sequences(structure), accessions):
+            letters = {
+                structure.residues[residue_index].number: letter
+                for residue_index, letter in zip(chain_sequence['residue_indices'], chain_sequence['sequence'])
+                if letter != 'X'
+            }
+            sequence = ''.join(letters.get(number, 'W') for number in range(1, max(letters) + 1))
+            file.write('>sp|' + accession + '|TEST_HUMAN\n' + sequence + '\n')
 
 
 class TestFixPdb:
@@ -17,3 +40,118 @@ class TestFixPdb:
         assert fx.compare_hash(self.paths['output_pdb_path'], self.paths['reference_output_pdb_path'])
         # Error in Biopython PDB parser
         # assert fx.equal(self.paths['output_pdb_path'], self.paths['reference_output_pdb_path'])
+
+    def test_launch_local_uniprot(self):
+        # Serve every forced reference from a local stand-in of the UniProt API
+        # Each reference sequence is the sequence of one of the input chains
+        structure = Structure.from_pdb_file(self.paths['input_pdb_path'])
+        chain_sequences = [chain_sequence['sequence'] for chain_sequence in get_chain_sequences(structure)]
+        accessions = self.properties['forced_uniprot_references']
+        sequences = dict(zip(accessions, chain_sequences))
+        requested_accessions = []
+
+        class UniprotHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                accession = self.path.rsplit('/', 1)[1]
+                requested_accessions.append(accession)
+                body = json.dumps({'sequence': {'sequence': sequences[accession]}}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), UniprotHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        uniprot_api_url = fix_pdb_utils.UNIPROT_API_URL
+        fix_pdb_utils.UNIPROT_API_URL = 'http://127.0.0.1:' + str(server.server_address[1]) + '/proteins/'
+        try:
+            fix_pdb(properties=self.properties, **self.paths)
+        finally:
+            fix_pdb_utils.UNIPROT_API_URL = uniprot_api_url
+            server.shutdown()
+            server.server_close()
+        assert sorted(requested_accessions) == sorted(accessions)
+        assert fx.not_empty(self.paths['output_pdb_path'])
+
+    def test_uniprot_requests(self, monkeypatch):
+        # The local stand-in of the UniProt API is reached through it as an HTTP proxy
+        # Old accessions are redirected and every client connection is counted to check they are kept alive
+        client_ports = set()
+        requested_urls = []
+
+        class ProxyHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                client_ports.add(self.client_address[1])
+                requested_urls.append(self.path)
+                accession = self.path.rsplit('/', 1)[1]
+                if accession == 'OLD':
+                    self.send_response(303)
+                    self.send_header('Location', '/proteins/P03176')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = json.dumps({'sequence': {'sequence': 'MASYPC' + accession}}).encode()
+                self.send_response(200 if accession != 'MISSING' else 404)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ProxyHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        monkeypatch.setenv('http_proxy', 'http://127.0.0.1:' + str(server.server_address[1]))
+        monkeypatch.delenv('no_proxy', raising=False)
+        monkeypatch.delenv('NO_PROXY', raising=False)
+        monkeypatch.setattr(fix_pdb_utils, 'UNIPROT_API_URL', 'http://uniprot.invalid/proteins/')
+        try:
+            references = fix_pdb_utils.get_uniprot_references(['P03176', 'OLD', 'Q00001', 'Q00002'], max_concurrency=1)
+            with pytest.raises(ValueError):
+                fix_pdb_utils.get_uniprot_reference('MISSING')
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert [reference['sequence'] for reference in references] == ['MASYPCP03176'] * 2 + ['MASYPCQ00001', 'MASYPCQ00002']
+        # Requests are sent to the proxy with the absolute URL and the redirect keeps the host
+        assert requested_urls[:3] == ['http://uniprot.invalid/proteins/P03176', 'http://uniprot.invalid/proteins/OLD', 'http://uniprot.invalid/proteins/P03176']
+        # A single connection is reused by all the references requests and a new one is opened for the last request
+        assert len(client_ports) == 2
+
+    def test_launch_uniprot_fasta(self):
+        # Forced references are read from the local FASTA file instead of the UniProt API
+        fasta_path = 'uniprot_fasta_forced.fasta'
+        write_reference_fasta(self.paths['reference_output_pdb_path'], self.properties['forced_uniprot_references'], fasta_path)
+        properties = {**self.properties, 'uniprot_fasta_path': fasta_path}
+        fix_pdb(properties=properties, **self.paths)
+        assert fx.not_empty(self.paths['output_pdb_path'])
+        assert fx.compare_hash(self.paths['output_pdb_path'], self.paths['reference_output_pdb_path'])
+
+    def test_launch_uniprot_fasta_search(self):
+        # With no forced references the chains are searched in the local FASTA file instead of running the BLAST
+        fasta_path = 'uniprot_fasta_search.fasta'
+        write_reference_fasta(self.paths['reference_output_pdb_path'], self.properties['forced_uniprot_references'], fasta_path)
+        properties = {**self.properties, 'forced_uniprot_references': None, 'uniprot_fasta_path': fasta_path}
+        fix_pdb(properties=properties, **self.paths)
+        assert fx.not_empty(self.paths['output_pdb_path'])
+        assert fx.compare_hash(self.paths['output_pdb_path'], self.paths['reference_output_pdb_path'])
+
+    def test_launch_alignment_memo(self, capsys):
+        # Every chain is aligned with every reference and the second run reads all alignments from the memo
+        fasta_path = 'alignment_memo.fasta'
+        write_reference_fasta(self.paths['reference_output_pdb_path'], self.properties['forced_uniprot_references'], fasta_path)
+        properties = {**self.properties, 'uniprot_fasta_path': fasta_path, 'alignment_memo_path': 'alignment_memo.db'}
+        fix_pdb(properties=properties, **self.paths)
+        assert 'Alignment memo: 0 hits, 4 misses' in capsys.readouterr().out
+        fix_pdb(properties=properties, **self.paths)
+        assert 'Alignment memo: 4 hits, 0 misses' in capsys.readouterr().out
+        assert fx.compare_hash(self.paths['output_pdb_path'], self.paths['reference_output_pdb_path'])
@@ -0,0 +1,144 @@
+# type: ignore
+import pytest
+
+from biobb_common.tools import test_fixtures as fx
+from biobb_model.model.alignment import get_aligner
+from biobb_model.model.fix_pdb_utils import (
+    BINARY_ALIGNMENT, Structure, align, find_exact_match, get_chain_sequences, read_binary_columns, read_binary_header
+)
+
+
+class TestFixPdbUtils:
+    def setup_class(self):
+        fx.test_setup(self, 'fix_pdb_utils')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_binary_roundtrip(self):
+        structure = Structure.from_pdb_file(self.paths['input_pdb_path'])
+        structure.generate_pdb_file(self.paths['output_pdb_path'])
+        content_hash = structure.generate_binary_file(self.paths['output_binary_path'])
+        assert read_binary_header(self.paths['output_binary_path'])['hash'] == content_hash
+        assert read_binary_columns(self.paths['output_binary_path'], ['coords'])['coords'].shape == (len(structure.atoms), 3)
+        Structure.from_binary_file(self.paths['output_binary_path'], verify=True).generate_pdb_file(self.paths['output_roundtrip_pdb_path'])
+        with open(self.paths['output_pdb_path'], 'rb') as file, open(self.paths['output_roundtrip_pdb_path'], 'rb') as roundtrip_file:
+            assert file.read() == roundtrip_file.read()
+
+    def test_pdb_atom_without_residue(self):
+        structure = Structure.from_pdb_file(self.paths['input_pdb_path'])
+        atom = structure.atoms[0]
+        atom.residue.remove_atom(atom)
+        with pytest.raises(ValueError, match='has no residue'):
+            structure.generate_pdb_file(self.paths['output_pdb_path'])
+
+    def test_binary_corrupted_hash(self):
+        structure = Structure.from_pdb_file(self.paths['input_pdb_path'])
+        structure.generate_binary_file(self.paths['output_binary_path'])
+        # Change the first coordinate, which is the first column after the header
+        header = read_binary_header(self.paths['output_binary_path'])
+        assert header['data_offset'] % BINARY_ALIGNMENT == 0
+        with open(self.paths['output_binary_path'], 'r+b') as file:
+            file.seek(header['data_offset'])
+            first_byte = file.read(1)
+            file.seek(header['data_offset'])
+            file.write(bytes([first_byte[0] ^ 0xFF]))
+        Structure.from_binary_file(self.paths['output_binary_path'])
+        with pytest.raises(ValueError):
+            Structure.from_binary_file(self.paths['output_binary_path'], verify=True)
+
+    def test_cif_roundtrip(self):
+        structure = Structure.from_pdb_file(self.paths['input_pdb_path'])
+        structure.generate_pdb_file(self.paths['output_pdb_path'])
+        structure.generate_cif_file(self.paths['output_cif_path'])
+        Structure.from_cif_file(self.paths['output_cif_path']).generate_pdb_file(self.paths['output_roundtrip_pdb_path'])
+        with open(self.paths['output_pdb_path'], 'rb') as file, open(self.paths['output_roundtrip_pdb_path'], 'rb') as roundtrip_file:
+            assert file.read() == roundtrip_file.read()
+
+    def test_cif_minimal_fields(self):
+        # Insertion codes and elements are missing, so they are blank and guessed from atom names
+        with open(self.paths['output_minimal_cif_path'], 'w') as file:
+            file.write(
+                'data_minimal\n'
+                'loop_\n'
+                '_atom_site.group_PDB\n'
+                '_atom_site.id\n'
+                '_atom_site.label_atom_id\n'
+                '_atom_site.label_comp_id\n'
+                '_atom_site.label_asym_id\n'
+                '_atom_site.label_seq_id\n'
+                '_atom_site.Cartn_x\n'
+                '_atom_site.Cartn_y\n'
+                '_atom_site.Cartn_z\n'
+                'ATOM 1 N GLY A 1 0.000 0.000 0.000\n'
+                'ATOM 2 CA GLY A 1 1.458 0.000 0.000\n'
+                'HETATM 3 ZN ZN B 2 5.000 5.000 5.000\n'
+                '#\n'
+            )
+        structure = Structure.from_cif_file(self.paths['output_minimal_cif_path'])
+        assert [atom.element for atom in structure.atoms] == ['N', 'C', 'ZN']
+        assert [residue.icode for residue in structure.residues] == ['', '']
+        assert [chain.name for chain in structure.chains] == ['A', 'B']
+
+    def test_renumber_residues(self):
+        structure = Structure.from_pdb_file(self.paths['input_pdb_path'])
+        residues_count = len(structure.residues)
+        structure.renumber_residues(list(range(1, residues_count + 1)), ['A'] + [None] * (residues_count - 1))
+        assert [residue.number for residue in structure.residues] == list(range(1, residues_count + 1))
+        assert structure.residues[0].icode == 'A'
+        assert structure.residues[1].icode == ''
+        # Wrong plans are rejected before any residue is changed
+        with pytest.raises(ValueError):
+            structure.renumber_residues([1000] * (residues_count - 1))
+        with pytest.raises(ValueError):
+            structure.renumber_residues([1000] * residues_count, [None] * (residues_count - 1) + [5])
+        assert [residue.number for residue in structure.residues] == list(range(1, residues_count + 1))
+
+    def test_rechain_residues(self):
+        structure = Structure.from_pdb_file(self.paths['input_pdb_path'])
+        chains_count = len(structure.chains)
+        moved_residue_indices = [residue.index for residue in structure.chains[1].residues]
+        plan = [None] * len(structure.residues)
+        plan[0] = 'Z'
+        for residue_index in moved_residue_indices:
+            plan[residue_index] = 'C'
+        structure.rechain_residues(plan)
+        # The second chain runs out of residues so it is purged and new chains are appended in order
+        assert len(structure.chains) == chains_count + 1
+        assert [chain.name for chain in structure.chains[-2:]] == ['Z', 'C']
+        assert structure.residues[0].chain.name == 'Z'
+        assert all(structure.residues[residue_index].chain.name == 'C' for residue_index in moved_residue_indices)
+        assert sum(len(chain.residues) for chain in structure.chains) == len(structure.residues)
+        # Wrong plans are rejected before any residue is moved
+        residue_chain_names = [residue.chain.name for residue in structure.residues]
+        with pytest.raises(ValueError):
+            structure.rechain_residues(['A'])
+        with pytest.raises(ValueError):
+            structure.rechain_residues(['A'] * (len(structure.residues) - 1) + [1])
+        assert [residue.chain.name for residue in structure.residues] == residue_chain_names
+        assert len(structure.chains) == chains_count + 1
+
+    def test_find_exact_match(self):
+        structure = Structure.from_pdb_file(self.paths['input_pdb_path'])
+        ref_sequence = get_chain_sequences(structure)[0]['sequence']
+        # A segment with unknown residues at both ends
+        segment = ref_sequence[20:80]
+        mapping, normalized_score = find_exact_match(ref_sequence, 'XX' + segment + 'X')
+        assert mapping == [None, None] + list(range(21, 81)) + [None]
+        # The score is the one of the local alignment, which finds the same ungapped segment
+        core_score = get_aligner().score(ref_sequence, segment)
+        assert normalized_score == pytest.approx(core_score / (len(segment) + 3))
+        assert align(ref_sequence, 'XX' + segment + 'X') == (mapping, normalized_score)
+        # Sequences which are not a segment of the reference fall back to the alignment
+        assert find_exact_match(ref_sequence, ref_sequence[20:40] + 'W' + ref_sequence[40:80]) is None
+        assert find_exact_match(ref_sequence, 'XXX') is None
+        # So do sequences with inner unknown residues, whose ungapped score may differ from the alignment score
+        inner_unknown_sequence = ref_sequence[20:40] + 'X' + ref_sequence[41:80]
+        assert find_exact_match(ref_sequence, inner_unknown_sequence) is None
+        mapping, _ = align(ref_sequence, inner_unknown_sequence)
+        assert mapping == [number if number != 41 else None for number in range(21, 81)]
+        # And sequences with letters which are not in the substitution matrix, e.g. selenocysteine
+        selenoprotein_sequence = ref_sequence[:30] + 'U' + ref_sequence[31:]
+        assert find_exact_match(selenoprotein_sequence, selenoprotein_sequence[20:80]) is None
+        mapping, _ = align(selenoprotein_sequence, selenoprotein_sequence[20:80])
+        assert mapping == list(range(21, 81))
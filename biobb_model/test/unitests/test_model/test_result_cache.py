@@ -0,0 +1,55 @@
+# type: ignore
+import filecmp
+import glob
+import os
+import shutil
+
+from biobb_common.tools import test_fixtures as fx
+from biobb_model.model.fix_ssbonds import fix_ssbonds
+from biobb_model.model.result_cache import ResultCache
+
+
+class TestResultCache:
+    def setup_class(self):
+        fx.test_setup(self, 'result_cache')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_launch_result_cache(self):
+        fix_ssbonds(properties=self.properties, **self.paths)
+        assert fx.equal(self.paths['output_pdb_path'], self.paths['reference_output_pdb_path'])
+        # Mark the cached output, so it is told apart from a new output
+        result_cache = ResultCache(self.properties['result_cache_path'])
+        (cached_output_path,) = glob.glob(os.path.join(result_cache.cache_path, '*', '*', 'output_pdb_path'))
+        with open(cached_output_path, 'a') as file:
+            file.write('REMARK   1 CACHED\n')
+        os.remove(self.paths['output_pdb_path'])
+        fix_ssbonds(properties=self.properties, **self.paths)
+        assert filecmp.cmp(self.paths['output_pdb_path'], cached_output_path, shallow=False)
+        # Another check_structure binary gives another key, so the block runs again and fails
+        os.remove(self.paths['output_pdb_path'])
+        assert fix_ssbonds(properties={**self.properties, 'binary_path': 'missing_check_structure'}, **self.paths)
+        assert not os.path.exists(self.paths['output_pdb_path'])
+
+    def test_get_key(self):
+        result_cache = ResultCache(self.properties['result_cache_path'])
+        shutil.copyfile(self.paths['input_pdb_path'], 'copy.pdb')
+        key = result_cache.get_key('TestBlock', {'input_pdb_path': self.paths['input_pdb_path']}, {'output_pdb_path': 'a.pdb'}, {})
+        # Paths are not part of the key, but contents, output formats and properties are
+        assert result_cache.get_key('TestBlock', {'input_pdb_path': 'copy.pdb'}, {'output_pdb_path': 'b/c.pdb'}, {}) == key
+        assert result_cache.get_key('TestBlock', {'input_pdb_path': 'copy.pdb'}, {'output_pdb_path': 'a.cif'}, {}) != key
+        assert result_cache.get_key('TestBlock', {'input_pdb_path': 'copy.pdb'}, {'output_pdb_path': 'a.pdb'}, {'a': 1}) != key
+        with open('copy.pdb', 'a') as file:
+            file.write('END\n')
+        assert result_cache.get_key('TestBlock', {'input_pdb_path': 'copy.pdb'}, {'output_pdb_path': 'a.pdb'}, {}) != key
+        # Results with missing outputs are not saved
+        result_cache.set_outputs(key, {'output_pdb_path': 'missing.pdb'})
+        assert not result_cache.get_outputs(key, {'output_pdb_path': 'restored.pdb'})
+        result_cache.set_outputs(key, {'output_pdb_path': 'copy.pdb'})
+        assert result_cache.get_outputs(key, {'output_pdb_path': 'restored.pdb'})
+        assert fx.equal('restored.pdb', 'copy.pdb')
+        # Saving a result which is already saved, e.g. by a concurrent process, keeps the first one
+        result_cache.set_outputs(key, {'output_pdb_path': self.paths['input_pdb_path']})
+        assert result_cache.get_outputs(key, {'output_pdb_path': 'restored.pdb'})
+        assert fx.equal('restored.pdb', 'copy.pdb')
@@ -0,0 +1,90 @@
+# type: ignore
+import json
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from biobb_common.tools import test_fixtures as fx
+from biobb_model.model import fix_pdb_utils, uniprot_cache
+from biobb_model.model.uniprot_cache import UniprotCache
+
+
+class TestUniprotCache:
+    def setup_class(self):
+        fx.test_setup(self, 'uniprot_cache')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_sequences(self):
+        cache = UniprotCache(self.paths['output_cache_path'], max_entries=2)
+        assert cache.get_sequence('P03176') is None
+        cache.set_sequence('P03176', 'MASYPC')
+        cache.set_sequence('P0DTC2', 'MFVFLV')
+        # Reading the first reference makes the second one the least recently used
+        assert UniprotCache(self.paths['output_cache_path']).get_sequence('P03176') == 'MASYPC'
+        cache.set_sequence('Q9BYF1', 'MSSSSW')
+        assert [cache.get_sequence(accession) for accession in ['P03176', 'P0DTC2', 'Q9BYF1']] == ['MASYPC', None, 'MSSSSW']
+
+    def test_expiration(self):
+        cache = UniprotCache(self.paths['output_cache_path'] + '.expiration', ttl=1)
+        cache.set_sequence('P03176', 'MASYPC')
+        assert cache.get_sequence('P03176') == 'MASYPC'
+        time.sleep(1.1)
+        assert cache.get_sequence('P03176') is None
+        assert cache.purge_expired() == 1
+
+    def test_journal_mode(self, monkeypatch):
+        # Write-ahead logging is unsafe on network file systems, so it is only used when it is enabled
+        for wal, journal_mode in [(None, 'delete'), ('1', 'wal')]:
+            cache_path = self.paths['output_cache_path'] + '.' + journal_mode
+            if wal:
+                monkeypatch.setenv('BIOBB_SQLITE_WAL', wal)
+            else:
+                monkeypatch.delenv('BIOBB_SQLITE_WAL', raising=False)
+            UniprotCache(cache_path).set_sequence('P03176', 'MASYPC')
+            connection = sqlite3.connect(cache_path)
+            assert connection.execute('PRAGMA journal_mode').fetchone()[0] == journal_mode
+            connection.close()
+
+    def test_prefetch(self, monkeypatch, capsys):
+        # Serve every accession from a local stand-in of the UniProt API, except the invalid one
+        class UniprotHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                accession = self.path.rsplit('/', 1)[1]
+                body = json.dumps({'sequence': {'sequence': 'MASYPC' + accession}}).encode()
+                self.send_response(404 if accession == 'INVALID' else 200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), UniprotHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        monkeypatch.setattr(fix_pdb_utils, 'UNIPROT_API_URL', 'http://127.0.0.1:' + str(server.server_address[1]) + '/proteins/')
+        cache_path = self.paths['output_cache_path'] + '.prefetch'
+        UniprotCache(cache_path).set_sequence('P03176', 'MASYPC')
+        monkeypatch.setattr(sys, 'argv', ['uniprot_prefetch', '-c', cache_path, 'P03176', 'INVALID', 'Q00001', 'Q00002'])
+        try:
+            # The invalid accession is reported but the rest are fetched anyway
+            with pytest.raises(SystemExit) as exit_info:
+                uniprot_cache.main()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert exit_info.value.code == 'Failed to fetch 1 of 3 references'
+        output = capsys.readouterr().out
+        assert 'P03176 -> Already cached' in output
+        assert 'INVALID -> Failed' in output
+        cache = UniprotCache(cache_path)
+        assert [cache.get_sequence(accession) for accession in ['P03176', 'INVALID', 'Q00001', 'Q00002']] == [
+            'MASYPC', None, 'MASYPCQ00001', 'MASYPCQ00002'
+        ]
@@ -0,0 +1,67 @@
+# type: ignore
+import os
+import random
+
+from biobb_common.tools import test_fixtures as fx
+from biobb_model.model.fix_pdb_utils import Structure, get_chain_sequences
+from biobb_model.model.uniprot_fasta import UniprotFastaIndex
+
+
+class TestUniprotFasta:
+    def setup_class(self):
+        fx.test_setup(self, 'uniprot_fasta')
+        structure = Structure.from_pdb_file(self.paths['input_pdb_path'])
+        self.sequence = get_chain_sequences(structure)[0]['sequence']
+        # Decoys are shuffles of the chain sequence, so they share its composition but not its k-mers
+        shuffler = random.Random(0)
+        self.decoys = [''.join(shuffler.sample(self.sequence, len(self.sequence))) for _ in range(20)]
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def write_fasta(self, sequence):
+        with open(self.paths['output_fasta_path'], 'w') as file:
+            for decoy_index, decoy in enumerate(self.decoys):
+                file.write('>sp|Q' + str(decoy_index).zfill(5) + '|DECOY_HUMAN\n' + decoy + '\n')
+            file.write('>sp|P03176|KITH_HHV11\n' + sequence + '\n')
+            file.write('>P00001\n' + sequence[:50] + '\n')
+            # A selenoprotein-like record, with letters which are not in the substitution matrix
+            file.write('>sp|P00002|SELENO_HUMAN\n' + sequence[30:120].replace('C', 'U').replace('K', 'O') + '\n')
+
+    def test_get_sequence(self):
+        self.write_fasta(self.sequence)
+        uniprot_fasta_index = UniprotFastaIndex(self.paths['output_fasta_path'])
+        assert os.path.exists(self.paths['output_fasta_path'] + '.idx')
+        assert uniprot_fasta_index.get_sequence('P03176') == self.sequence
+        assert uniprot_fasta_index.get_sequence('P00001') == self.sequence[:50]
+        assert uniprot_fasta_index.get_sequence('Q00019') == self.decoys[19]
+        assert uniprot_fasta_index.get_sequence('P99999') is None
+        uniprot_fasta_index.close()
+        # The index is built again when the FASTA file changes
+        self.write_fasta(self.sequence[10:])
+        os.utime(self.paths['output_fasta_path'], (0, os.path.getmtime(self.paths['output_fasta_path'] + '.idx') + 1))
+        uniprot_fasta_index = UniprotFastaIndex(self.paths['output_fasta_path'])
+        assert uniprot_fasta_index.get_sequence('P03176') == self.sequence[10:]
+        uniprot_fasta_index.close()
+
+    def test_search(self):
+        self.write_fasta(self.sequence)
+        uniprot_fasta_index = UniprotFastaIndex(self.paths['output_fasta_path'])
+        # A fragment with a few unknown residues is found among the decoys
+        fragment = self.sequence[30:60] + 'X' + self.sequence[61:120]
+        assert uniprot_fasta_index.search(fragment) == 'P03176'
+        kmer_index_path = uniprot_fasta_index.get_kmer_index_path()
+        assert os.path.dirname(kmer_index_path) == os.path.abspath(self.paths['output_fasta_path'] + '.kmers')
+        assert os.path.isdir(kmer_index_path)
+        # Sequences with no similar reference or no indexed k-mers are not found
+        assert uniprot_fasta_index.search('W' * 60) is None
+        assert uniprot_fasta_index.search('XXXXXX') is None
+        uniprot_fasta_index.close()
+        # A new FASTA version gets a new index and the previous one is removed
+        self.write_fasta(self.sequence[10:])
+        os.utime(self.paths['output_fasta_path'], (0, os.path.getmtime(self.paths['output_fasta_path']) + 10))
+        uniprot_fasta_index = UniprotFastaIndex(self.paths['output_fasta_path'])
+        assert uniprot_fasta_index.search(fragment) == 'P03176'
+        assert uniprot_fasta_index.get_kmer_index_path() != kmer_index_path
+        assert os.listdir(self.paths['output_fasta_path'] + '.kmers') == [os.path.basename(uniprot_fasta_index.get_kmer_index_path())]
+        uniprot_fasta_index.close()
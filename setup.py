@@ -22,6 +22,7 @@ setuptools.setup(
     install_requires=[
         "biobb_common==5.2.2",
         "biobb_structure_checking>=3.15.6",
+        "numpy",
         "xmltodict",
     ],
     python_requires=">=3.10",
@@ -36,6 +37,8 @@ setuptools.setup(
             "fix_side_chain = biobb_model.model.fix_side_chain:main",
             "mutate = biobb_model.model.mutate:main",
             "fix_pdb = biobb_model.model.fix_pdb:main",
+            "fix_pipeline = biobb_model.model.fix_pipeline:main",
+            "uniprot_prefetch = biobb_model.model.uniprot_cache:main",
         ]
     },
     classifiers=[